@@ -2,6 +2,9 @@
 from .monte_carlo import MonteCarloSimulation
 from .black_scholes_merton import BlackScholesMertonModel
 from .sentiment_analysis import SentimentAnalysis, Stock_SentimentAnalysis
+from .var_backtest import VaR_Backtest
+from .stress_testing import StressTest
+from .portfolio_optimisation import PortfolioOptimiser
 
 # Import utility functions
 from .utils.data_fetching import WebScraper, MonteCarlo_StockData, Black_Scholes_Merton_StockData, Finnhub
@@ -12,6 +15,9 @@ __all__ = [
     "BlackScholesMertonModel",
     "SentimentAnalysis",
     "Stock_SentimentAnalysis",
+    "VaR_Backtest",
+    "StressTest",
+    "PortfolioOptimiser",
     "WebScraper",
     "MonteCarlo_StockData", 
     "Black_Scholes_Merton_StockData", 
@@ -2,17 +2,27 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 
 # Classes
 from backend.sentiment_analysis import Stock_SentimentAnalysis
 from backend.black_scholes_merton import BlackScholesMertonModel
 from backend.monte_carlo import MonteCarloSimulation
+from backend.var_backtest import VaR_Backtest
+from backend.stress_testing import StressTest
+from backend.portfolio_optimisation import PortfolioOptimiser
 
 # Utility
-from backend.utils.data_fetching import MonteCarlo_StockData
-from pydantic import BaseModel
-from typing import List
+from backend.utils.data_fetching import MonteCarlo_StockData, Black_Scholes_Merton_StockData
+from backend.utils.result_cache import ResultCache
+from backend.utils.cost_model import SimulationCostModel
+from backend.utils.ticker_universe import get_ticker_universe
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime, timedelta
+from copy import copy
+import asyncio
+import os
 
 app = FastAPI(
     title="stock evaluator service",
@@ -32,6 +42,14 @@ app.add_middleware(
 # Global variables to store instance
 black_scholes_merton_instance = None
 monte_carlo_instance = None
+var_backtest_instance = None
+
+# Finished simulations keyed by request, data snapshot and seed
+monte_carlo_cache = ResultCache(max_bytes=512 * 1024**2)
+
+# Admission control: simulations are costed before running; long ones are queued and run one at a time off the event loop
+simulation_cost_model = SimulationCostModel(memory_budget=2 * 1024**3, max_interactive_seconds=10, max_seconds=300)
+simulation_queue = asyncio.Semaphore(1)
 
 class BlackScholesMertonRequest(BaseModel):
     interest_rate: float = 0.02
@@ -47,13 +65,82 @@ class StockSymbolsRequest(BaseModel):
     stock_symbols: List[str] = ["AAPL", "TSLA", "AMZN"]
     num_each_stock: List[int] = [20, 30, 50]
     historical_timeframe: int = 365
-    forecast_timeframe: int = 30
-    num_simulations: int = 100
+    forecast_timeframe: int = Field(30, ge=1)
+    num_simulations: int = Field(100, ge=1)
+    chunk_size: Optional[int] = Field(None, ge=1)
+    num_workers: Optional[int] = Field(None, ge=1, le=os.cpu_count() or 1) # processes forked by the simulation
+    seed: Optional[int] = None
+    sampling_engine: str = "standard"
+    target_relative_error: Optional[float] = Field(None, gt=0)
+    max_simulations: int = Field(100000, ge=1)
+    num_factors: Optional[int] = Field(None, ge=1)
+    quantile_sketch_k: Optional[int] = Field(None, ge=1)
+    bootstrap: Optional[str] = None
+    block_length: int = Field(5, ge=1)
+
+class RepriceRequest(BaseModel):
+    num_each_stock: Optional[List[float]] = None
+    weights: Optional[List[float]] = None
+
+class PortfolioBatchRequest(BaseModel):
+    weights: List[List[float]]
+    init_portfolio_value: Optional[float] = None
+
+class TermStructureRequest(BaseModel):
+    percentiles: List[float] = [5, 25, 50, 75, 95]
+
+class PortfolioOptimisationRequest(BaseModel):
+    stock_symbols: List[str] = ["AAPL", "TSLA", "AMZN"]
+    historical_timeframe: int = 365
+    risk_free_rate: float = 0.02
+    allow_short: bool = False
+    num_points: int = 50
+    num_random_portfolios: int = 10000
+    seed: Optional[int] = None
+
+class StressTestRequest(BaseModel):
+    stock_symbols: List[str] = ["AAPL", "TSLA", "AMZN"]
+    weights: List[List[float]] = [[0.2, 0.3, 0.5]]
+    init_portfolio_value: Optional[List[float]] = None
+    scenarios: Optional[List[str]] = None
+
+class VaRBacktestRequest(BaseModel):
+    stock_symbols: List[str] = ["AAPL", "TSLA", "AMZN"]
+    num_each_stock: List[int] = [20, 30, 50]
+    historical_timeframe: int = 6 * 365 # five years of forecasts after the first estimation window
+    window: int = 252
+    num_simulations: int = 1000
+    var_percentile: float = 5
+    seed: Optional[int] = None
+
+class SpotVolatilityRequest(BaseModel):
+    tickers: List[str] = ["AAPL", "TSLA", "AMZN"]
+    period: str = "6mo"
+
+class TickerSearchRequest(BaseModel):
+    query: str = "app"
+    limit: int = 20
 
 @app.on_event("startup")
 async def startup_event():
     global black_scholes_merton_instance
     global monte_carlo_instance
+    global var_backtest_instance
+    simulation_cost_model.calibrate()
+
+def admit_simulation(request: StockSymbolsRequest) -> dict:
+    return simulation_cost_model.admit(
+        stock_len=len(request.stock_symbols),
+        forecast_timeframe=request.forecast_timeframe,
+        num_simulations=request.num_simulations,
+        chunk_size=request.chunk_size,
+        num_workers=request.num_workers,
+        sampling_engine=request.sampling_engine,
+        target_relative_error=request.target_relative_error,
+        max_simulations=request.max_simulations,
+        num_factors=request.num_factors,
+        bootstrap=request.bootstrap
+    )
     
 # ------------
 # POSTs
@@ -82,17 +169,142 @@ async def initialise_black_scholes_merton(request: BlackScholesMertonRequest):
 @app.post("/initialise_monte_carlo")
 async def initialise_monte_carlo(request: StockSymbolsRequest):
     global monte_carlo_instance
+
+    # Reject oversized simulations before downloading anything, or switch them to streaming
+    cost_estimate = admit_simulation(request)
+    if cost_estimate["decision"] == "reject":
+        raise HTTPException(status_code=400, detail={"message": cost_estimate["reason"], "cost_estimate": cost_estimate})
+    request = request.model_copy(update={"chunk_size": cost_estimate["chunk_size"]})
     
-    # Initialise or reinitialise the MonteCarloSimulation instance
+    # Initialise or reinitialise the MonteCarloSimulation instance; downloads run in the threadpool so concurrent requests share them
     start_date = datetime.now() - timedelta(days=request.historical_timeframe)
-    stock_data = MonteCarlo_StockData(stock_list=request.stock_symbols, start_date=start_date, num_each_stock=request.num_each_stock)
-    monte_carlo_instance = MonteCarloSimulation(
+    stock_data = await run_in_threadpool(MonteCarlo_StockData, stock_list=request.stock_symbols, start_date=start_date, num_each_stock=request.num_each_stock)
+
+    cache_key = monte_carlo_cache.make_key(request.model_dump(), stock_data.snapshot_hash())
+    cached_instance = monte_carlo_cache.get(cache_key)
+    if cached_instance is not None:
+        monte_carlo_instance = cached_instance
+        return {"message": "Monte Carlo simulation initialised successfully (cached).", "cost_estimate": cost_estimate}
+
+    simulation_arguments = dict(
         stock_data=stock_data,
         num_simulations=request.num_simulations,
-        forecast_timeframe=request.forecast_timeframe
+        forecast_timeframe=request.forecast_timeframe,
+        chunk_size=request.chunk_size,
+        num_workers=request.num_workers,
+        seed=request.seed,
+        sampling_engine=request.sampling_engine,
+        target_relative_error=request.target_relative_error,
+        max_simulations=request.max_simulations,
+        num_factors=request.num_factors,
+        quantile_sketch_k=request.quantile_sketch_k,
+        bootstrap=request.bootstrap,
+        block_length=request.block_length
     )
+    try:
+        if cost_estimate["queued"]:
+            async with simulation_queue:
+                monte_carlo_instance = await run_in_threadpool(MonteCarloSimulation, **simulation_arguments)
+        else:
+            monte_carlo_instance = MonteCarloSimulation(**simulation_arguments)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    monte_carlo_cache.put(cache_key, monte_carlo_instance, monte_carlo_instance.nbytes())
+    
+    return {"message": "Monte Carlo simulation initialised successfully.", "cost_estimate": cost_estimate}
+
+@app.post("/monte_carlo/estimate_cost")
+async def estimate_monte_carlo_cost(request: StockSymbolsRequest):
+    return admit_simulation(request)
+
+@app.post("/monte_carlo/reprice")
+async def reprice_monte_carlo(request: RepriceRequest):
+    global monte_carlo_instance
+    if monte_carlo_instance is None:
+        raise HTTPException(status_code=500, detail="Monte Carlo instance not initialised.")
+    
+    # Reprice a copy so that the cached simulation keeps its original shares, and the current one survives a rejected reprice
+    repriced_instance = copy(monte_carlo_instance)
+    repriced_instance.stock_data = copy(repriced_instance.stock_data)
+
+    try:
+        repriced_instance.reprice(num_each_stock=request.num_each_stock, weights=request.weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    monte_carlo_instance = repriced_instance
+    
+    return {"message": "Monte Carlo simulation repriced successfully."}
+
+@app.post("/monte_carlo/evaluate_portfolios")
+async def evaluate_portfolios(request: PortfolioBatchRequest):
+    if monte_carlo_instance is None:
+        raise HTTPException(status_code=500, detail="Monte Carlo instance not initialised.")
+    
+    try:
+        metrics = monte_carlo_instance.evaluate_portfolios(request.weights, init_portfolio_value=request.init_portfolio_value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {"message": "Monte Carlo simulation initialised successfully."}
+    return {name: values.tolist() for name, values in metrics.items()}
+
+@app.post("/initialise_var_backtest")
+async def initialise_var_backtest(request: VaRBacktestRequest):
+    global var_backtest_instance
+
+    start_date = datetime.now() - timedelta(days=request.historical_timeframe)
+    stock_data = await run_in_threadpool(MonteCarlo_StockData, stock_list=request.stock_symbols, start_date=start_date, num_each_stock=request.num_each_stock)
+
+    try:
+        var_backtest_instance = VaR_Backtest(
+            stock_data=stock_data,
+            window=request.window,
+            num_simulations=request.num_simulations,
+            var_percentile=request.var_percentile,
+            seed=request.seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"message": "VaR backtest initialised successfully."}
+
+@app.post("/portfolio_optimisation")
+async def portfolio_optimisation(request: PortfolioOptimisationRequest):
+    start_date = datetime.now() - timedelta(days=request.historical_timeframe)
+    stock_data = await run_in_threadpool(MonteCarlo_StockData, stock_list=request.stock_symbols, start_date=start_date)
+    optimiser = PortfolioOptimiser(stock_data, risk_free_rate=request.risk_free_rate, allow_short=request.allow_short)
+
+    try:
+        frontier = optimiser.efficient_frontier(num_points=request.num_points)
+        minimum_variance = optimiser.minimum_variance()
+        maximum_sharpe = optimiser.maximum_sharpe()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Random portfolios are a fallback view of the feasible region; only the best one's weights are returned
+    random_portfolios = optimiser.random_portfolios(num_portfolios=request.num_random_portfolios, seed=request.seed)
+    best_random = int(random_portfolios["sharpe_ratio"].argmax())
+
+    return {
+        "stocks": stock_data.stocks,
+        "efficient_frontier": {key: value.tolist() for key, value in frontier.items()},
+        "minimum_variance": {key: value.tolist() for key, value in minimum_variance.items()},
+        "maximum_sharpe": {key: value.tolist() for key, value in maximum_sharpe.items()},
+        "random_portfolios": {
+            "returns": random_portfolios["returns"].tolist(),
+            "volatility": random_portfolios["volatility"].tolist(),
+            "sharpe_ratio": random_portfolios["sharpe_ratio"].tolist(),
+            "best_weights": random_portfolios["weights"][best_random].tolist()
+        }
+    }
+
+@app.post("/stress_test")
+async def stress_test(request: StressTestRequest):
+    try:
+        stress_test_instance = StressTest(stock_list=request.stock_symbols, scenarios=request.scenarios)
+        results = await run_in_threadpool(stress_test_instance.run, request.weights, init_portfolio_value=request.init_portfolio_value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {name: {key: value.tolist() if hasattr(value, "tolist") else value for key, value in scenario.items()} for name, scenario in results.items()}
 
 # ---
 # Sentiment Analysis
@@ -130,6 +342,16 @@ async def black_scholes_merton_option():
     img_buf = black_scholes_merton_instance.plot_payoff()
     return StreamingResponse(img_buf, media_type="image/png")
 
+@app.post("/black_scholes_merton_option/spot_and_volatility")
+async def spot_and_volatility(request: SpotVolatilityRequest):
+    try:
+        spots_and_volatilities = await run_in_threadpool(Black_Scholes_Merton_StockData.get_spots_and_volatilities, request.tickers, request.period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # NaN (tickers without data) is not valid JSON
+    spots_and_volatilities = spots_and_volatilities.astype(object).where(spots_and_volatilities.notna(), None)
+    return spots_and_volatilities.to_dict(orient="index")
+
 # ---
 # Monte Carlo Simulations
 # ---
@@ -141,6 +363,38 @@ async def get_key_data():
     key_data = monte_carlo_instance.get_key_data()
     return key_data
 
+@app.post("/monte_carlo/summary")
+async def get_summary():
+    if monte_carlo_instance is None:
+        raise HTTPException(status_code=500, detail="Monte Carlo instance not initialised.")
+    
+    summary = monte_carlo_instance.get_summary()
+    return summary
+
+@app.post("/monte_carlo/var_term_structure")
+async def get_var_term_structure(request: TermStructureRequest):
+    if monte_carlo_instance is None:
+        raise HTTPException(status_code=500, detail="Monte Carlo instance not initialised.")
+    
+    try:
+        term_structure = monte_carlo_instance.var_term_structure(percentiles=request.percentiles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return term_structure
+
+@app.post("/monte_carlo/risk_estimates")
+async def get_risk_estimates():
+    if monte_carlo_instance is None:
+        raise HTTPException(status_code=500, detail="Monte Carlo instance not initialised.")
+    
+    risk_estimates = monte_carlo_instance.estimate_risk_metrics()
+    return risk_estimates
+
+@app.post("/monte_carlo/cache_stats")
+async def get_cache_stats():
+    return monte_carlo_cache.stats()
+
 @app.post("/monte_carlo/plot_simulation_lines")
 async def plot_simulation_lines():
     if monte_carlo_instance is None:
@@ -149,6 +403,17 @@ async def plot_simulation_lines():
     plot_json = monte_carlo_instance.plot_simulation_lines(return_as_json=True)
     return plot_json
 
+@app.post("/monte_carlo/plot_simulation_fan")
+async def plot_simulation_fan():
+    if monte_carlo_instance is None:
+        raise HTTPException(status_code=500, detail="Monte Carlo instance not initialised.")
+    
+    try:
+        plot_json = monte_carlo_instance.plot_simulation_fan(return_as_json=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return plot_json
+
 @app.post("/monte_carlo/plot_simulation_avg")
 async def plot_simulation_avg():
     if monte_carlo_instance is None:
@@ -195,4 +460,36 @@ async def generate_risk_metrics():
         raise HTTPException(status_code=500, detail="Monte Carlo instance not initialised.")
     
     risk_metrics_table = monte_carlo_instance.display_risk_metrics_table_with_insights()
-    return StreamingResponse(risk_metrics_table, media_type="image/png")
\ No newline at end of file
+    return StreamingResponse(risk_metrics_table, media_type="image/png")
+
+# ---
+# VaR Backtest
+# ---
+@app.post("/var_backtest/results")
+async def var_backtest_results():
+    if var_backtest_instance is None:
+        raise HTTPException(status_code=500, detail="VaR backtest instance not initialised.")
+    
+    return var_backtest_instance.get_results()
+
+@app.post("/var_backtest/series")
+async def var_backtest_series():
+    if var_backtest_instance is None:
+        raise HTTPException(status_code=500, detail="VaR backtest instance not initialised.")
+    
+    return var_backtest_instance.get_series()
+
+@app.post("/var_backtest/plot_backtest")
+async def plot_var_backtest():
+    if var_backtest_instance is None:
+        raise HTTPException(status_code=500, detail="VaR backtest instance not initialised.")
+    
+    plot_json = var_backtest_instance.plot_backtest(return_as_json=True)
+    return plot_json
+
+# ---
+# Tickers
+# ---
+@app.post("/tickers/search")
+async def search_tickers(request: TickerSearchRequest):
+    return await run_in_threadpool(get_ticker_universe().search, request.query, request.limit)
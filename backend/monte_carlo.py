@@ -4,12 +4,38 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.colors
 import plotly.graph_objects as go
+from scipy.stats import norm, qmc
 
 # Utility
 from backend.utils.data_fetching import MonteCarlo_StockData # demo + type hint
-from typing import Union, Tuple
+from backend.utils.risk_statistics import MonteCarlo_RiskAccumulator, MonteCarlo_Summary, risk_estimates, control_variate_weights, batch_means_standard_errors, portfolio_risk_metrics, risk_term_structure
+from typing import Union, Tuple, Optional, List
 from matplotlib.figure import Figure
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import warnings
+
+# Paths per SeedSequence child stream in parallel mode, fixed so that output does not depend on the worker count
+PARALLEL_BLOCK_SIZE = 10_000
+
+SAMPLING_ENGINES = ['standard', 'antithetic', 'sobol', 'control_variate']
+# Batches used for batch-means standard errors, and independent scrambles per Sobol draw
+NUM_BATCHES = 16
+# Historical simulation: resampling schemes of the downloaded daily return vectors
+BOOTSTRAP_METHODS = ['stationary', 'block']
+SOBOL_MAX_DIMENSION = 21201
+
+# Adaptive mode: paths per batch when chunk_size is not given, and batches required before the stopping rule is checked
+ADAPTIVE_BATCH_SIZE = 1_000
+MIN_ADAPTIVE_BATCHES = 4
+
+# Final value and per-day percentiles reported in the summary, and representative paths drawn on the fan chart
+SUMMARY_PERCENTILES = [5, 25, 50, 75, 95]
+FAN_CHART_SAMPLE_PATHS = 20
+# Above this many paths, plot_simulation_lines packs them into a few colour-bucketed WebGL traces
+LINE_TRACE_LIMIT = 1_000
+NUM_COLOUR_BUCKETS = 10
 
 class MonteCarloSimulation:
     """
@@ -20,10 +46,27 @@ class MonteCarloSimulation:
         forecast_timeframe (int): How many days into the future to forecast.
         num_simulations (int): Number of Monte Carlo simulations to run.
         init_portfolio_value (None|int|float): The initial portfolio value. If input == None, value is determined through stock_data outputs.
+        seed (None|int): Seed for the random number generator. If input == None, results are not reproducible.
+        chunk_size (None|int): If provided, paths are simulated in chunks of this size and only running statistics are kept (streaming mode), so stock_sims_matrix, sims_matrix and final_values are None.
+        num_workers (None|int): If provided, paths are simulated across a pool of this many processes (parallel mode). Paths are split into fixed blocks with independent SeedSequence child streams, so a given seed gives identical output for any number of workers.
+        sampling_engine (str): Accepts 'standard' (plain Gaussian draws), 'antithetic' (paired Z and -Z draws), 'sobol' (scrambled Sobol quasi-random draws) or 'control_variate' (VaR, CVaR and mean re-weighted against the analytic mean final value; not available in streaming mode).
+        target_relative_error (None|float): If provided, num_simulations is ignored and paths are simulated in batches (of chunk_size, or ADAPTIVE_BATCH_SIZE) until the standard errors of VaR and CVaR, relative to the corresponding loss from the initial portfolio value, are at most this value (adaptive mode). num_sim is then the number of paths actually used.
+        max_simulations (int): Path budget of adaptive mode.
+        quantile_sketch_k (None|int): If provided, streaming and adaptive runs estimate VaR, CVaR and percentiles from a mergeable KLL sketch with this k (constant memory, normalised rank error below about 2 / k) instead of keeping the exact lowest final values.
+        num_factors (None|int): If provided, daily returns are drawn from a PCA factor model with this many factors plus idiosyncratic noise instead of the full Cholesky factor (factor mode). Suited to large portfolios; the approximation error is reported in get_key_data.
+        bootstrap (None|str): If provided, daily returns are resampled from the historical return vectors of stock_data instead of drawn from a normal distribution (historical simulation). Accepts 'stationary' (blocks of geometric length, Politis & Romano) or 'block' (circular blocks of fixed length). Keeps fat tails, cross-correlation and short-range autocorrelation without any matrix factorisation; only the 'standard' sampling engine applies.
+        block_length (int): Mean (stationary) or fixed (block) number of consecutive historical days per resampled block.
     
     Methods:
         get_key_data: Returns key financial information from stock_data input.
+        get_summary: Returns the precomputed aggregates (mean paths, final value percentiles, VaR, CVaR, Sharpe ratio) as a dictionary.
+        estimate_risk_metrics: Returns the mean final value, VaR and CVaR with the standard errors achieved by the sampling engine.
+        reprice: Recomputes the portfolio paths and risk metrics for new shares or weights from the stored stock paths, without simulating again.
+        nbytes: Returns the memory held by the simulation's arrays.
+        var_term_structure: Returns VaR, CVaR and percentiles of the portfolio value for every forecast day.
+        evaluate_portfolios: Returns VaR, CVaR, mean, standard deviation and Sharpe ratio of many weight vectors over the same stored stock paths.
         plot_simulation_lines: Plots all the simulations performed.
+        plot_simulation_fan: Plots per-day percentile bands and a few representative simulations; the payload size does not depend on the number of simulations.
         plot_simulation_avg: Plots the average line, based on all the simulations performed.
         plot_individual_prices: Plots the individual change in prices of stocks on a graph.
         plot_individual_cumulative_returns: Plots the individual change in returns (%) of stocks on a graph.
@@ -31,13 +74,56 @@ class MonteCarloSimulation:
         corr_heatmap: Plots the correlation matrix of stocks.
         display_risk_metrics_table_with_insights: Plots the standard deviation, mean final value and sharpe ratio along with an assessment of the risk of the portfolio.
     """
-    def __init__(self, stock_data: MonteCarlo_StockData, forecast_timeframe: int = 30, num_simulations: int = 100, init_portfolio_value: Union[None, int, float] = None):
+    def __init__(self, stock_data: MonteCarlo_StockData, forecast_timeframe: int = 30, num_simulations: int = 100, init_portfolio_value: Union[None, int, float] = None, seed: Optional[int] = None, chunk_size: Optional[int] = None, num_workers: Optional[int] = None, sampling_engine: str = "standard", target_relative_error: Optional[float] = None, max_simulations: int = 100_000, num_factors: Optional[int] = None, quantile_sketch_k: Optional[int] = None, bootstrap: Optional[str] = None, block_length: int = 5):
         if not isinstance(stock_data, MonteCarlo_StockData):
             raise TypeError("Expected an instance of the StockData class.")
         self.stock_data = stock_data
         self.stock_len = self.stock_data.stock_len
         self.num_sim = num_simulations
         self.time = forecast_timeframe
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.chunk_size = chunk_size
+        self.num_workers = num_workers
+
+        # Normalise sampling_engine
+        if sampling_engine.lower() not in SAMPLING_ENGINES:
+            raise ValueError("Invalid sampling engine. Use 'standard', 'antithetic', 'sobol' or 'control_variate'.")
+        self.sampling_engine = sampling_engine.lower()
+        if self.sampling_engine == 'control_variate' and self.chunk_size is not None:
+            raise ValueError("The control variate engine needs every final value and cannot be combined with chunk_size.")
+
+        self.target_relative_error = target_relative_error
+        self.max_simulations = max_simulations
+        self.target_met = None
+        if self.target_relative_error is not None and self.num_workers is not None:
+            raise ValueError("Adaptive mode (target_relative_error) cannot be combined with num_workers.")
+
+        self.quantile_sketch_k = quantile_sketch_k
+
+        self.num_factors = num_factors
+        self.factor_model_error = None
+        if self.num_factors is not None:
+            if not 1 <= self.num_factors <= self.stock_len:
+                raise ValueError("Number of factors must be between 1 and the number of stocks in the portfolio.")
+            self.factor_loadings, self.idiosyncratic_variance, self.factor_model_error = self._fit_factor_model()
+
+        # Normalise bootstrap
+        self.bootstrap = None if bootstrap is None else bootstrap.lower()
+        self.block_length = block_length
+        if self.bootstrap is not None:
+            if self.bootstrap not in BOOTSTRAP_METHODS:
+                raise ValueError("Invalid bootstrap method. Use 'stationary' or 'block'.")
+            if self.sampling_engine != 'standard' or self.num_factors is not None:
+                raise ValueError("Historical simulation (bootstrap) only supports the 'standard' sampling engine and cannot be combined with num_factors.")
+            self.historical_returns = np.asarray(self.stock_data.returns.dropna(), dtype=float)
+            if not 1 <= self.block_length <= len(self.historical_returns):
+                raise ValueError("Block length must be between 1 and the number of historical returns.")
+
+        # Factor the covariance once; every chunk, batch and block reuses it
+        self.cholesky_factor = None
+        if self.num_factors is None and self.bootstrap is None:
+            self.cholesky_factor = np.linalg.cholesky(self.stock_data.cov_matrix)
 
         # Defaults to portfolio fetched by StockData class but can also be adjusted by user
         if init_portfolio_value is not None:
@@ -45,44 +131,397 @@ class MonteCarloSimulation:
         else:
             self.init_portfolio_value = sum(self.stock_data.values)
 
-        self.stock_sims_matrix, self.sims_matrix = self._create_simulation_matrix()
-        self.final_values = self.sims_matrix[-1]
+        if self.target_relative_error is not None:
+            self.risk_accumulator = self._new_risk_accumulator(self.max_simulations)
+            self._run_adaptive_simulations()
+        else:
+            self.risk_accumulator = self._new_risk_accumulator(self.num_sim)
+            if self.num_workers is not None:
+                self._run_parallel_simulations()
+            elif self.chunk_size is None:
+                self.stock_sims_matrix, self.sims_matrix = self._create_simulation_matrix()
+                self.final_values = self.sims_matrix[-1]
+                self.risk_accumulator.update(self.sims_matrix, self.stock_sims_matrix)
+            else:
+                self.stock_sims_matrix, self.sims_matrix, self.final_values = None, None, None
+                self._stream_simulations()
+
+        self.summary = self._summarise()
+
+    def _new_risk_accumulator(self, num_simulations: int, seed: Union[None, int, np.random.SeedSequence] = None) -> MonteCarlo_RiskAccumulator:
+        return MonteCarlo_RiskAccumulator(self.time, self.stock_len, num_simulations, sketch_k=self.quantile_sketch_k,
+                                          seed=self.seed if seed is None else seed)
 
     def get_key_data(self) -> dict:
-        return self.stock_data.get_key_data()
+        key_data = self.stock_data.get_key_data()
+        if self.factor_model_error is not None:
+            key_data["factor_model"] = self.factor_model_error
+        return key_data
+
+    def get_summary(self) -> dict:
+        return self.summary.to_dict()
+
+    def nbytes(self) -> int:
+        arrays = [value for value in list(vars(self).values()) + list(vars(self.risk_accumulator).values()) if isinstance(value, np.ndarray)]
+        return sum(array.nbytes for array in arrays)
+
+    def estimate_risk_metrics(self) -> dict:
+        """
+        Returns the mean final value, 5% VaR and CVaR as estimated by the sampling engine, along with their batch-means standard errors.
+        In streaming mode each chunk is one batch, so standard errors are None with fewer than two chunks.
+        """
+        if self.final_values is None:
+            estimates = (self.risk_accumulator.mean_final_value(), self.risk_accumulator.value_at_risk(), self.risk_accumulator.conditional_value_at_risk())
+            standard_errors = self.risk_accumulator.standard_errors()
+        else:
+            estimates = self._risk_estimates(self.final_values)
+            standard_errors = batch_means_standard_errors([self._risk_estimates(self.final_values[batch]) for batch in self._batch_indices()])
+
+        output = {"sampling_engine": self.sampling_engine, "num_paths": self.num_sim}
+        for name, estimate, standard_error in zip(["mean_final_value", "VaR_5", "CVaR_5"], estimates, standard_errors):
+            output[name] = float(estimate)
+            output[f"{name}_standard_error"] = None if np.isnan(standard_error) else float(standard_error)
+        if self.target_relative_error is not None:
+            output["target_relative_error"] = self.target_relative_error
+            output["max_simulations"] = self.max_simulations
+            output["target_met"] = self.target_met
+        return output
+
+    def reprice(self, num_each_stock: Optional[List[float]] = None, weights: Optional[List[float]] = None) -> None:
+        """
+        Re-weights the portfolio over the stored stock paths instead of simulating again. Provide either num_each_stock or weights (normalised to sum to 1, keeping the current portfolio value).
+        Daily returns are recovered from consecutive stock prices and contracted with the new weights in one matmul, giving exactly the paths a fresh simulation with the same draws would produce.
+        """
+        if self.stock_sims_matrix is None:
+            raise ValueError("Repricing needs the stored stock paths and is not available in streaming mode.")
+        if (num_each_stock is None) == (weights is None):
+            raise ValueError("Provide either num_each_stock or weights.")
+
+        # Validate before changing any state, so a rejected reprice leaves the simulation as it was
+        if weights is not None:
+            if len(weights) != self.stock_len:
+                raise ValueError("Length of weights provided does not match number of stocks in portfolio.")
+            weights = np.asarray(weights, dtype=float)
+            if not np.isfinite(weights).all() or not np.isfinite(weights.sum()) or weights.sum() == 0:
+                raise ValueError("Weights must be finite and must not sum to zero.")
+            num_each_stock = weights / weights.sum() * self.stock_data.port_value / np.asarray(self.stock_data.mean_price)
+        else:
+            if len(num_each_stock) != self.stock_len:
+                raise ValueError("Length of numbers provided does not match number of stocks in portfolio.")
+            values = np.asarray(num_each_stock, dtype=float) * np.asarray(self.stock_data.mean_price)
+            if not np.isfinite(values).all() or values.sum() == 0:
+                raise ValueError("Shares must be finite and the portfolio value must not be zero.")
+        self.stock_data.update_num_each_stock(num_each_stock)
+        self.init_portfolio_value = sum(self.stock_data.values)
+
+        self.sims_matrix = np.cumprod(self._stock_growth_factors() @ np.asarray(self.stock_data.weights), axis=0) * self.init_portfolio_value
+        self.final_values = self.sims_matrix[-1]
+
+        self.risk_accumulator = self._new_risk_accumulator(self.num_sim)
+        self.risk_accumulator.update(self.sims_matrix, self.stock_sims_matrix)
+        self.summary = self._summarise()
+
+    def var_term_structure(self, percentiles: List[float] = SUMMARY_PERCENTILES) -> dict:
+        """
+        Returns the risk term structure from the stored portfolio paths: for each horizon (1 to forecast_timeframe days), the 5% VaR, CVaR and the requested percentiles of the portfolio value.
+        Arrays are returned as lists so the payload can be sent as is.
+        """
+        if self.sims_matrix is None:
+            raise ValueError("The term structure needs the stored portfolio paths and is not available in streaming mode.")
+        term_structure = risk_term_structure(self.sims_matrix, percentiles)
+        return {
+            "horizon_days": term_structure["horizon_days"].tolist(),
+            "VaR_5": term_structure["VaR"].tolist(),
+            "CVaR_5": term_structure["CVaR"].tolist(),
+            "percentiles": {str(percentile): values.tolist() for percentile, values in term_structure["percentiles"].items()}
+        }
+
+    def evaluate_portfolios(self, weights_matrix: Union[List[List[float]], np.ndarray], init_portfolio_value: Union[None, int, float] = None) -> dict:
+        """
+        Evaluates every row of weights_matrix (num_portfolios, stock_len) against the same stored stock paths, so all portfolios share common random numbers.
+        Rows are normalised to sum to 1 and every portfolio starts at init_portfolio_value (defaults to the simulated portfolio's value).
+        Returns arrays of VaR_5, CVaR_5, mean_final_value, std_final_value and sharpe_ratio, one entry per portfolio.
+        """
+        if self.stock_sims_matrix is None:
+            raise ValueError("Evaluating portfolios needs the stored stock paths and is not available in streaming mode.")
+        weights_matrix = np.atleast_2d(np.asarray(weights_matrix, dtype=float))
+        if weights_matrix.shape[1] != self.stock_len:
+            raise ValueError("Number of weights per portfolio does not match number of stocks in portfolio.")
+        row_sums = weights_matrix.sum(axis=1, keepdims=True)
+        if not np.isfinite(weights_matrix).all() or not np.isfinite(row_sums).all() or (row_sums == 0).any():
+            raise ValueError("Every portfolio's weights must be finite and must not sum to zero.")
+        weights_matrix = weights_matrix / row_sums
+        init_portfolio_value = self.init_portfolio_value if init_portfolio_value is None else init_portfolio_value
+
+        # Compound one day at a time so that memory stays at (num_sim, num_portfolios)
+        growth = self._stock_growth_factors()
+        final_values = np.full((self.num_sim, len(weights_matrix)), float(init_portfolio_value))
+        for day_growth in growth:
+            final_values *= day_growth @ weights_matrix.T
+
+        return portfolio_risk_metrics(final_values, init_portfolio_value)
+
+    def _stock_growth_factors(self) -> np.ndarray:
+        """Daily growth factors (1 + daily return) of shape (time, num_sim, stock_len), recovered from the stored stock paths."""
+        growth = np.empty_like(self.stock_sims_matrix)
+        np.divide(self.stock_sims_matrix[0], np.asarray(self.stock_data.mean_price), out=growth[0])
+        np.divide(self.stock_sims_matrix[1:], self.stock_sims_matrix[:-1], out=growth[1:])
+        return growth
+
+    def _summarise(self) -> MonteCarlo_Summary:
+        """
+        Computes every aggregate used by the plots and the summary endpoint in one pass.
+        Percentiles and the histogram are exact when final_values are held, and come from the accumulator's histogram in streaming mode.
+        """
+        accumulator = self.risk_accumulator
+        mean_final_value, std_final_value = accumulator.mean_final_value(), accumulator.std_final_value()
+
+        if self.final_values is not None:
+            # Same estimator as estimate_risk_metrics (control variate weighted for that engine), so the summary, risk table and Sharpe ratio agree with it
+            mean_final_value, VaR_5, CVaR_5 = self._risk_estimates(self.final_values)
+            # One quantile call gives the fan chart bands for every day; the last day gives the final value percentiles
+            path_percentiles = np.percentile(self.sims_matrix, SUMMARY_PERCENTILES, axis=1)
+            percentiles = path_percentiles[:, -1]
+            histogram_counts, histogram_edges = np.histogram(self.final_values, bins=accumulator.num_bins)
+            sample_indices = np.random.default_rng(self.seed).choice(self.num_sim, size=min(FAN_CHART_SAMPLE_PATHS, self.num_sim), replace=False)
+            sample_paths = self.sims_matrix[:, np.sort(sample_indices)]
+        else:
+            VaR_5, CVaR_5 = accumulator.value_at_risk(), accumulator.conditional_value_at_risk()
+            percentiles = accumulator.approximate_percentiles(SUMMARY_PERCENTILES)
+            path_percentiles = accumulator.path_percentiles(SUMMARY_PERCENTILES) if accumulator.path_sketch is not None else None
+            histogram_counts, histogram_edges = accumulator.histogram()
+            sample_paths = accumulator.sample_paths[:, :FAN_CHART_SAMPLE_PATHS]
+
+        return MonteCarlo_Summary(
+            average_path=accumulator.average_path(),
+            average_stock_prices=accumulator.average_stock_prices(),
+            path_min=accumulator.path_min,
+            path_max=accumulator.path_max,
+            mean_final_value=mean_final_value,
+            std_final_value=std_final_value,
+            VaR_5=VaR_5,
+            CVaR_5=CVaR_5,
+            sharpe_ratio=(mean_final_value - self.init_portfolio_value) / std_final_value,
+            final_value_percentiles=dict(zip(SUMMARY_PERCENTILES, percentiles)),
+            histogram_counts=histogram_counts,
+            histogram_edges=histogram_edges,
+            path_percentiles=None if path_percentiles is None else dict(zip(SUMMARY_PERCENTILES, path_percentiles)),
+            sample_paths=sample_paths
+        )
+
+    def _risk_estimates(self, final_values: np.ndarray) -> Tuple[float, float, float]:
+        weights = None
+        if self.sampling_engine == 'control_variate':
+            weights = control_variate_weights(final_values, self._analytic_mean_final_value())
+        return risk_estimates(final_values, weights=weights)
+
+    def _analytic_mean_final_value(self) -> float:
+        """Daily returns are independent across days, so the expected final value is init * (1 + w.mu)^time."""
+        return self.init_portfolio_value * (1 + np.dot(self.stock_data.weights, self.stock_data.mean_returns))**self.time
+
+    def _batch_indices(self) -> list:
+        """Contiguous batches of paths. Batch boundaries fall on even indices so antithetic pairs are never split."""
+        boundaries = np.linspace(0, self.num_sim, min(NUM_BATCHES, self.num_sim // 2) + 1).astype(int)
+        boundaries[1:-1] -= boundaries[1:-1] % 2
+        return [slice(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
 
     def _create_simulation_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
-        mean_matrix = np.full(shape=(self.time, self.stock_len), fill_value=self.stock_data.mean_returns).T
-        
-        #store simulated performance of individual stock
-        stock_sims_matrix = np.zeros((self.time, self.num_sim, self.stock_len)) 
-        mean_price = np.array(self.stock_data.mean_price) 
+        """
+        Simulates all paths in one batch: the covariance is factored once and every shock is drawn as a single (time, num_sim, stock) tensor.
+        Returns stock_sims_matrix of shape (time, num_sim, stock_len) and sims_matrix of shape (time, num_sim).
+        """
+        return self._simulate_paths(self.num_sim, self.rng)
+
+    def _stream_simulations(self) -> None:
+        """Simulates paths in chunks of chunk_size, feeding each chunk into the risk accumulator before discarding it."""
+        for start in range(0, self.num_sim, self.chunk_size):
+            stock_sims_chunk, sims_chunk = self._simulate_paths(min(self.chunk_size, self.num_sim - start), self.rng)
+            self.risk_accumulator.update(sims_chunk, stock_sims_chunk)
+
+    def _run_adaptive_simulations(self) -> None:
+        """
+        Simulates batches until the batch-means relative standard errors of VaR and CVaR reach target_relative_error, or max_simulations is used up.
+        Errors are relative to the loss (init_portfolio_value - estimate), which is what the VaR actually reports.
+        """
+        batch_size = self.chunk_size or ADAPTIVE_BATCH_SIZE
+        batch_estimates, stock_sims_batches, sims_batches = [], [], []
+        self.num_sim = 0
+        self.target_met = False
+
+        while self.num_sim < self.max_simulations:
+            stock_sims_batch, sims_batch = self._simulate_paths(min(batch_size, self.max_simulations - self.num_sim), self.rng)
+            self.risk_accumulator.update(sims_batch, stock_sims_batch)
+            batch_estimates.append(self._risk_estimates(sims_batch[-1]))
+            self.num_sim += sims_batch.shape[1]
+            if self.chunk_size is None:
+                stock_sims_batches.append(stock_sims_batch)
+                sims_batches.append(sims_batch)
+
+            if len(batch_estimates) >= MIN_ADAPTIVE_BATCHES:
+                _, VaR_se, CVaR_se = batch_means_standard_errors(batch_estimates)
+                _, VaR, CVaR = np.mean(batch_estimates, axis=0)
+                VaR_relative_error = VaR_se / max(abs(self.init_portfolio_value - VaR), np.finfo(float).tiny)
+                CVaR_relative_error = CVaR_se / max(abs(self.init_portfolio_value - CVaR), np.finfo(float).tiny)
+                if max(VaR_relative_error, CVaR_relative_error) <= self.target_relative_error:
+                    self.target_met = True
+                    break
+
+        if self.chunk_size is None:
+            self.stock_sims_matrix = np.concatenate(stock_sims_batches, axis=1)
+            self.sims_matrix = np.concatenate(sims_batches, axis=1)
+            self.final_values = self.sims_matrix[-1]
+        else:
+            self.stock_sims_matrix, self.sims_matrix, self.final_values = None, None, None
+
+    def _run_parallel_simulations(self) -> None:
+        """
+        Simulates fixed-size blocks of paths, each from its own SeedSequence child stream, across a process pool.
+        In full mode, workers write their blocks into shared memory; in streaming mode, each block returns its own risk accumulator and they are merged in block order.
+        """
+        block_size = self.chunk_size or PARALLEL_BLOCK_SIZE
+        block_starts = list(range(0, self.num_sim, block_size))
+        block_sizes = [min(block_size, self.num_sim - start) for start in block_starts]
+        seed_sequences = np.random.SeedSequence(self.seed).spawn(len(block_starts))
+
+        if self.chunk_size is not None:
+            if self.num_workers == 1:
+                block_accumulators = map(_accumulate_block, [self] * len(block_sizes), block_sizes, seed_sequences)
+            else:
+                with ProcessPoolExecutor(max_workers=self.num_workers) as pool:
+                    block_accumulators = list(pool.map(_accumulate_block, [self] * len(block_sizes), block_sizes, seed_sequences))
+            for block_accumulator in block_accumulators:
+                self.risk_accumulator.merge(block_accumulator)
+            self.stock_sims_matrix, self.sims_matrix, self.final_values = None, None, None
+            return
+
+        if self.num_workers == 1:
+            self.stock_sims_matrix = np.empty((self.time, self.num_sim, self.stock_len))
+            self.sims_matrix = np.empty((self.time, self.num_sim))
+            for start, num_sim, seed_sequence in zip(block_starts, block_sizes, seed_sequences):
+                stock_sims_block, sims_block = _simulate_block(self, num_sim, seed_sequence)
+                self.stock_sims_matrix[:, start:start + num_sim] = stock_sims_block
+                self.sims_matrix[:, start:start + num_sim] = sims_block
+        else:
+            stock_sims_shm = SharedMemory(create=True, size=self.time * self.num_sim * self.stock_len * 8)
+            sims_shm = SharedMemory(create=True, size=self.time * self.num_sim * 8)
+            try:
+                with ProcessPoolExecutor(max_workers=self.num_workers) as pool:
+                    futures = [
+                        pool.submit(_simulate_block_to_shared_memory, self, start, num_sim, seed_sequence, stock_sims_shm.name, sims_shm.name)
+                        for start, num_sim, seed_sequence in zip(block_starts, block_sizes, seed_sequences)
+                    ]
+                    for future in futures:
+                        future.result()
+                self.stock_sims_matrix = np.ndarray((self.time, self.num_sim, self.stock_len), buffer=stock_sims_shm.buf).copy()
+                self.sims_matrix = np.ndarray((self.time, self.num_sim), buffer=sims_shm.buf).copy()
+            finally:
+                for shm in (stock_sims_shm, sims_shm):
+                    shm.close()
+                    shm.unlink()
 
-        sims_matrix = np.zeros((self.time, self.num_sim))
+        self.final_values = self.sims_matrix[-1]
+        self.risk_accumulator.update(self.sims_matrix, self.stock_sims_matrix)
 
-        for m in range(self.num_sim):
-            Z = np.random.normal(size=(self.time, self.stock_data.stock_len))
-            L = np.linalg.cholesky(self.stock_data.cov_matrix)
-            daily_returns = mean_matrix + np.inner(L, Z)
+    def _simulate_paths(self, num_sim: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns stock paths of shape (time, num_sim, stock_len) and portfolio paths of shape (time, num_sim)."""
+        daily_returns = self._simulate_daily_returns(num_sim, rng)
+        sims_matrix = np.cumprod(daily_returns @ np.asarray(self.stock_data.weights) + 1, axis=0) * self.init_portfolio_value
 
-            cumulative_returns = np.cumprod(daily_returns + 1, axis=0)
-            stock_prices = cumulative_returns * mean_price.reshape(-1, 1)
-            stock_sims_matrix[:, m, :] = stock_prices.T
-            
-            sims_matrix[:, m] = np.cumprod(np.inner(self.stock_data.weights, daily_returns.T) + 1) * self.init_portfolio_value
+        # Compound returns along the time axis in place to avoid a second tensor-sized allocation
+        daily_returns += 1
+        stock_sims_matrix = np.cumprod(daily_returns, axis=0, out=daily_returns)
+        stock_sims_matrix *= np.asarray(self.stock_data.mean_price)
 
         return stock_sims_matrix, sims_matrix
+
+    def _simulate_daily_returns(self, num_sim: int, rng: np.random.Generator) -> np.ndarray:
+        """Draws correlated daily returns of shape (time, num_sim, stock_len) from a multivariate normal distribution, or resamples them from history."""
+        if self.bootstrap is not None:
+            return self.historical_returns[self._bootstrap_indices(num_sim, rng)]
+        if self.num_factors is None:
+            Z = self._draw_shocks(num_sim, rng, self.stock_len)
+
+            # Flatten to a single 2D matmul, which is considerably faster than a stacked one
+            daily_returns = (Z.reshape(-1, self.stock_len) @ self.cholesky_factor.T).reshape(Z.shape)
+        else:
+            # Factor model: k common factor shocks through the loadings plus independent idiosyncratic noise, O(n*k) per step
+            Z = self._draw_shocks(num_sim, rng, self.num_factors + self.stock_len)
+            daily_returns = (Z[..., :self.num_factors].reshape(-1, self.num_factors) @ self.factor_loadings.T).reshape(self.time, num_sim, self.stock_len)
+            daily_returns += Z[..., self.num_factors:] * np.sqrt(self.idiosyncratic_variance)
+        daily_returns += np.asarray(self.stock_data.mean_returns)
+        return daily_returns
+
+    def _bootstrap_indices(self, num_sim: int, rng: np.random.Generator) -> np.ndarray:
+        """Historical day index of every (day, path), of shape (time, num_sim). Blocks wrap around the end of the history."""
+        num_days = len(self.historical_returns)
+        if self.bootstrap == 'block':
+            num_blocks = -(-self.time // self.block_length)
+            starts = rng.integers(0, num_days, size=(num_blocks, 1, num_sim))
+            offsets = np.arange(self.block_length)[np.newaxis, :, np.newaxis]
+            return ((starts + offsets) % num_days).reshape(-1, num_sim)[:self.time]
+
+        # Stationary bootstrap: each day starts a new block with probability 1 / block_length, otherwise continues the current one
+        new_block = rng.random(size=(self.time, num_sim)) < 1 / self.block_length
+        new_block[0] = True
+        starts = rng.integers(0, num_days, size=(self.time, num_sim))
+        days = np.arange(self.time)[:, np.newaxis]
+        block_start_day = np.maximum.accumulate(np.where(new_block, days, 0), axis=0)
+        return (np.take_along_axis(starts, block_start_day, axis=0) + days - block_start_day) % num_days
+
+    def _fit_factor_model(self) -> Tuple[np.ndarray, np.ndarray, dict]:
+        """
+        Approximates the covariance matrix as B @ B.T + D from its top num_factors principal components, with D the diagonal residual variance.
+        Returns the loadings B (stock_len, num_factors), the diagonal of D and the approximation error.
+        """
+        cov_matrix = np.asarray(self.stock_data.cov_matrix)
+        eigenvalues, eigenvectors = np.linalg.eigh(cov_matrix)
+        top = np.argsort(eigenvalues)[::-1][:self.num_factors]
+        factor_loadings = eigenvectors[:, top] * np.sqrt(np.clip(eigenvalues[top], 0, None))
+
+        # Residual variance keeps the diagonal exact; the floor keeps every stock's noise strictly positive
+        idiosyncratic_variance = np.clip(np.diag(cov_matrix) - (factor_loadings**2).sum(axis=1), 1e-12, None)
+
+        approximation = factor_loadings @ factor_loadings.T + np.diag(idiosyncratic_variance)
+        factor_model_error = {
+            "num_factors": self.num_factors,
+            "explained_variance_ratio": float(np.clip(eigenvalues[top], 0, None).sum() / np.clip(eigenvalues, 0, None).sum()),
+            "relative_frobenius_error": float(np.linalg.norm(cov_matrix - approximation) / np.linalg.norm(cov_matrix))
+        }
+        return factor_loadings, idiosyncratic_variance, factor_model_error
     
+    def _draw_shocks(self, num_sim: int, rng: np.random.Generator, dimension: int) -> np.ndarray:
+        """Draws independent standard normal shocks of shape (time, num_sim, dimension) using the chosen sampling engine."""
+        if self.sampling_engine == 'antithetic':
+            # Adjacent paths form (Z, -Z) pairs
+            half = rng.standard_normal(size=(self.time, (num_sim + 1) // 2, dimension))
+            return np.stack([half, -half], axis=2).reshape(self.time, -1, dimension)[:, :num_sim]
+
+        if self.sampling_engine == 'sobol':
+            if self.time * dimension > SOBOL_MAX_DIMENSION:
+                raise ValueError(f"Sobol sampling supports at most {SOBOL_MAX_DIMENSION} dimensions (forecast_timeframe * number of shocks per day).")
+            # Independent scrambles give randomised QMC replicates; Sobol balance warnings for non powers of 2 are expected
+            replicate_sizes = [len(replicate) for replicate in np.array_split(np.arange(num_sim), min(NUM_BATCHES, num_sim))]
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", category=UserWarning)
+                U = np.vstack([qmc.Sobol(d=self.time * dimension, scramble=True, seed=rng).random(size) for size in replicate_sizes])
+            U = np.clip(U, 1e-12, 1 - 1e-12)
+            return norm.ppf(U).reshape(num_sim, self.time, dimension).transpose(1, 0, 2)
+
+        return rng.standard_normal(size=(self.time, num_sim, dimension))
+
     def plot_simulation_lines(self, return_as_json: bool = True) -> Union[str, Figure]:
-        """Generates interactive simulation lines using Plotly."""
-        days = list(range(self.sims_matrix.shape[0]))
+        """Generates interactive simulation lines using Plotly. In streaming mode, only the sampled paths are drawn."""
+        paths = self.sims_matrix if self.sims_matrix is not None else self.risk_accumulator.sample_paths
+        if paths.shape[1] > LINE_TRACE_LIMIT:
+            return self._plot_simulation_lines_webgl(paths, return_as_json)
+        days = list(range(paths.shape[0]))
         fig = go.Figure()
 
-        color_scale = plotly.colors.sample_colorscale("Spectral", np.linspace(0, 1, self.sims_matrix.shape[1]))
-        for i in range(self.sims_matrix.shape[1]):
+        color_scale = plotly.colors.sample_colorscale("Spectral", np.linspace(0, 1, paths.shape[1]))
+        for i in range(paths.shape[1]):
             fig.add_trace(go.Scatter(
                 x=days,
-                y=self.sims_matrix[:, i],
+                y=paths[:, i],
                 mode='lines',
                 line=dict(color=color_scale[i], width=1.5),
                 showlegend=False,
@@ -92,7 +531,80 @@ class MonteCarloSimulation:
             title="Monte Carlo Simulations",
             xaxis_title="Days",
             yaxis_title="Portfolio Value (USD)",
-            yaxis=dict(range=[self.sims_matrix.min() - 100, self.sims_matrix.max() + 100]),
+            yaxis=dict(range=[self.summary.path_min - 100, self.summary.path_max + 100]),
+            template="plotly_white"
+        )
+
+        formatted_fig = self._return_format(fig, return_as_json = return_as_json)
+        return formatted_fig
+
+    def _plot_simulation_lines_webgl(self, paths: np.ndarray, return_as_json: bool) -> Union[str, Figure]:
+        """
+        High-volume variant of plot_simulation_lines: paths are sorted by final value into NUM_COLOUR_BUCKETS Scattergl traces, each holding its paths end to end with NaN separators.
+        Coordinates are float32 arrays; plotly >= 6 serialises them as base64 typed arrays, while the pinned plotly 5 writes plain lists that its own Figure can load back.
+        """
+        days = np.arange(self.time + 1, dtype=np.float32)
+        days[-1] = np.nan # separator between consecutive paths
+        padded_paths = np.vstack([paths, np.full((1, paths.shape[1]), np.nan)]).astype(np.float32)
+        buckets = np.array_split(np.argsort(paths[-1]), NUM_COLOUR_BUCKETS)
+        color_scale = plotly.colors.sample_colorscale("Spectral", np.linspace(0, 1, len(buckets)))
+        fig = go.Figure()
+
+        for colour, bucket in zip(color_scale, buckets):
+            fig.add_trace(go.Scattergl(
+                x=np.tile(days, len(bucket)),
+                y=padded_paths[:, bucket].ravel(order='F'),
+                mode='lines',
+                line=dict(color=colour, width=1),
+                connectgaps=False,
+                hoverinfo='skip',
+                showlegend=False,
+            ))
+
+        fig.update_layout(
+            title="Monte Carlo Simulations",
+            xaxis_title="Days",
+            yaxis_title="Portfolio Value (USD)",
+            yaxis=dict(range=[self.summary.path_min - 100, self.summary.path_max + 100]),
+            template="plotly_white"
+        )
+
+        return self._return_format(fig, return_as_json)
+
+    def plot_simulation_fan(self, return_as_json: bool = True) -> Union[str, Figure]:
+        """Generates a fan chart of the 5-95% and 25-75% bands, the median and a few representative simulations using Plotly."""
+        if self.summary.path_percentiles is None:
+            raise ValueError("Percentile bands are not available in streaming mode without a quantile sketch (quantile_sketch_k).")
+        bands = self.summary.path_percentiles
+        days = list(range(self.time))
+        fig = go.Figure()
+
+        for path in self.summary.sample_paths.T:
+            fig.add_trace(go.Scatter(
+                x=days,
+                y=path,
+                mode='lines',
+                line=dict(color='rgba(128, 128, 128, 0.35)', width=1),
+                hoverinfo='skip',
+                showlegend=False,
+            ))
+
+        for lower, upper, colour, name in [(5, 95, 'rgba(0, 122, 204, 0.15)', '5% - 95%'), (25, 75, 'rgba(0, 122, 204, 0.35)', '25% - 75%')]:
+            fig.add_trace(go.Scatter(x=days, y=bands[lower], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+            fig.add_trace(go.Scatter(x=days, y=bands[upper], mode='lines', line=dict(width=0), fill='tonexty', fillcolor=colour, name=name))
+
+        fig.add_trace(go.Scatter(
+            x=days,
+            y=bands[50],
+            mode='lines',
+            name='Median',
+            line=dict(color='#007acc', width=2),
+        ))
+
+        fig.update_layout(
+            title="Monte Carlo Simulations (Percentile Bands)",
+            xaxis_title="Days",
+            yaxis_title="Portfolio Value (USD)",
             template="plotly_white"
         )
 
@@ -101,7 +613,7 @@ class MonteCarloSimulation:
 
     def plot_simulation_avg(self, return_as_json: bool = True) -> Union[str, Figure]:
         """Generates interactive average simulation plot using Plotly."""
-        average_values = np.mean(self.sims_matrix, axis=1)
+        average_values = self.summary.average_path
         days = list(range(len(average_values)))
 
         fig = go.Figure()
@@ -137,10 +649,11 @@ class MonteCarloSimulation:
         return formatted_fig
     
     def plot_individual_prices(self, return_as_json: bool = True) -> Union[str, Figure]:
-        days = list(range(self.stock_sims_matrix.shape[0]))  # Time steps (days)
+        days = list(range(self.time))  # Time steps (days)
+        average_stock_prices = self.summary.average_stock_prices
         fig = go.Figure()
         for index, stock in enumerate(self.stock_data.stocks):
-            average_prices = np.mean(self.stock_sims_matrix[:, :, index], axis=1)
+            average_prices = average_stock_prices[:, index]
             fig.add_trace(go.Scatter(
                 x=days,
                 y=average_prices,
@@ -160,10 +673,11 @@ class MonteCarloSimulation:
         return formatted_fig
 
     def plot_individual_cumulative_returns(self, return_as_json: bool = True) -> Union[str, Figure]:
-        days = list(range(self.stock_sims_matrix.shape[0]))  # Time steps (days)
+        days = list(range(self.time))  # Time steps (days)
+        average_stock_prices = self.summary.average_stock_prices
         fig = go.Figure()
         for index, stock in enumerate(self.stock_data.stocks):
-            cumulative_returns = np.mean(self.stock_sims_matrix[:, :, index], axis=1) / self.stock_data.mean_price[index] - 1
+            cumulative_returns = average_stock_prices[:, index] / self.stock_data.mean_price[index] - 1
             fig.add_trace(go.Scatter(
                 x=days,
                 y=cumulative_returns,
@@ -182,13 +696,14 @@ class MonteCarloSimulation:
         return formatted_fig
 
     def plot_histogram_with_risk_metrics(self, return_as_json: bool = True) -> Union[str, Figure]:
-        """Generates histogram with VaR and CVaR using Plotly."""
-        VaR_5 = np.percentile(self.final_values, 5)
-        CVaR_5 = self.final_values[self.final_values <= VaR_5].mean()
+        """Generates histogram with VaR and CVaR using Plotly, from the pre-binned counts of the summary."""
+        VaR_5, CVaR_5 = self.summary.VaR_5, self.summary.CVaR_5
+        counts, edges = self.summary.histogram_counts, self.summary.histogram_edges
         fig = go.Figure()
-        fig.add_trace(go.Histogram(
-            x=self.final_values,
-            nbinsx=30,
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
             marker=dict(color="skyblue", line=dict(color="black", width=1)),
         ))
         fig.add_vline(x=VaR_5, line=dict(color="red", dash="dash"))
@@ -263,9 +778,9 @@ class MonteCarloSimulation:
         
     def display_risk_metrics_table_with_insights(self) -> BytesIO:
     
-        std_dev = np.std(self.final_values)
-        mean_return = np.mean(self.final_values)
-        sharpe_ratio = (mean_return - self.init_portfolio_value) / std_dev
+        std_dev = self.summary.std_final_value
+        mean_return = self.summary.mean_final_value
+        sharpe_ratio = self.summary.sharpe_ratio
 
         # Generate insights
         insights = []
@@ -343,6 +858,31 @@ class MonteCarloSimulation:
         else:
             return fig
 
+# Parallel workers (module level so that they can be pickled by the process pool)
+def _simulate_block(simulation: MonteCarloSimulation, num_sim: int, seed_sequence: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    return simulation._simulate_paths(num_sim, np.random.default_rng(seed_sequence))
+
+def _accumulate_block(simulation: MonteCarloSimulation, num_sim: int, seed_sequence: np.random.SeedSequence) -> MonteCarlo_RiskAccumulator:
+    stock_sims_block, sims_block = _simulate_block(simulation, num_sim, seed_sequence)
+    accumulator = simulation._new_risk_accumulator(simulation.num_sim, seed=seed_sequence.spawn(1)[0])
+    accumulator.update(sims_block, stock_sims_block)
+    return accumulator
+
+def _simulate_block_to_shared_memory(simulation: MonteCarloSimulation, start: int, num_sim: int, seed_sequence: np.random.SeedSequence,
+                                     stock_sims_name: str, sims_name: str) -> None:
+    stock_sims_block, sims_block = _simulate_block(simulation, num_sim, seed_sequence)
+    stock_sims_shm = SharedMemory(name=stock_sims_name)
+    sims_shm = SharedMemory(name=sims_name)
+    try:
+        stock_sims_matrix = np.ndarray((simulation.time, simulation.num_sim, simulation.stock_len), buffer=stock_sims_shm.buf)
+        sims_matrix = np.ndarray((simulation.time, simulation.num_sim), buffer=sims_shm.buf)
+        stock_sims_matrix[:, start:start + num_sim] = stock_sims_block
+        sims_matrix[:, start:start + num_sim] = sims_block
+        del stock_sims_matrix, sims_matrix # release the buffer views before closing
+    finally:
+        stock_sims_shm.close()
+        sims_shm.close()
+
 
 if __name__ == "__main__":
     # This demo mimics the backend to frontend process
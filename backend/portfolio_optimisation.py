@@ -0,0 +1,97 @@
+# Imports
+import numpy as np
+from scipy.optimize import minimize, linprog
+
+# Utility
+from backend.utils.data_fetching import MonteCarlo_StockData # type hint
+from typing import Optional, Tuple
+
+# Daily statistics are annualised with this many trading days
+TRADING_DAYS = 252
+
+class PortfolioOptimiser:
+    """
+    Finds optimal portfolio weights from the mean returns and covariance matrix of MonteCarlo_StockData.
+    Returns and volatilities are annualised. Every set of portfolios is evaluated in one batch: returns as W @ mu and variances as the row sums of (W @ cov) * W.
+
+    Inputs:
+        stock_data (MonteCarlo_StockData): Financial information of stocks of a portfolio.
+        risk_free_rate (float): Annual risk-free rate used in the Sharpe ratio.
+        allow_short (bool): If True, each weight may lie between -1 and 1 instead of between 0 and 1. Weights always sum to 1.
+
+    Methods:
+        minimum_variance: Returns the portfolio with the lowest volatility.
+        maximum_sharpe: Returns the portfolio with the highest Sharpe ratio.
+        efficient_frontier: Returns the minimum-volatility portfolios for a range of target returns.
+        random_portfolios: Returns the statistics of randomly sampled long-only weight vectors.
+        portfolio_statistics: Returns the annualised return, volatility and Sharpe ratio of a batch of weight vectors.
+    """
+    def __init__(self, stock_data: MonteCarlo_StockData, risk_free_rate: float = 0.0, allow_short: bool = False):
+        self.stocks = stock_data.stocks
+        self.stock_len = stock_data.stock_len
+        self.mean_returns = np.asarray(stock_data.mean_returns) * TRADING_DAYS
+        self.cov_matrix = np.asarray(stock_data.cov_matrix) * TRADING_DAYS
+        self.risk_free_rate = risk_free_rate
+        self.allow_short = allow_short
+        self.bounds = [(-1, 1) if allow_short else (0, 1)] * self.stock_len
+        self.constraints = [{"type": "eq", "fun": lambda weights: weights.sum() - 1, "jac": lambda weights: np.ones_like(weights)}]
+
+    def portfolio_statistics(self, weights_matrix: np.ndarray) -> dict:
+        weights_matrix = np.atleast_2d(weights_matrix)
+        returns = weights_matrix @ self.mean_returns
+        volatility = np.sqrt(np.maximum(((weights_matrix @ self.cov_matrix) * weights_matrix).sum(axis=1), 0))
+        return {
+            "returns": returns,
+            "volatility": volatility,
+            "sharpe_ratio": (returns - self.risk_free_rate) / volatility
+        }
+
+    def minimum_variance(self) -> dict:
+        weights = self._solve(lambda weights: (weights @ self.cov_matrix @ weights, 2 * self.cov_matrix @ weights))
+        return self._describe(weights)
+
+    def maximum_sharpe(self) -> dict:
+        def negative_sharpe(weights: np.ndarray) -> Tuple[float, np.ndarray]:
+            excess_return = weights @ self.mean_returns - self.risk_free_rate
+            cov_weights = self.cov_matrix @ weights
+            volatility = np.sqrt(weights @ cov_weights)
+            gradient = -(self.mean_returns * volatility - excess_return * cov_weights / volatility) / volatility**2
+            return -excess_return / volatility, gradient
+
+        return self._describe(self._solve(negative_sharpe))
+
+    def efficient_frontier(self, num_points: int = 50) -> dict:
+        """
+        Minimum-volatility portfolios for num_points target returns, from the minimum-variance portfolio's return up to the highest attainable return.
+        Each solve is warm-started from the previous frontier point.
+        """
+        minimum_variance_weights = self.minimum_variance()["weights"]
+        highest_return = -linprog(-self.mean_returns, A_eq=np.ones((1, self.stock_len)), b_eq=[1], bounds=self.bounds).fun
+        target_returns = np.linspace(minimum_variance_weights @ self.mean_returns, highest_return, num_points)
+
+        weights_matrix = np.empty((num_points, self.stock_len))
+        weights = minimum_variance_weights
+        for i, target_return in enumerate(target_returns):
+            target_constraint = {"type": "eq", "fun": lambda weights, target_return=target_return: weights @ self.mean_returns - target_return, "jac": lambda weights: self.mean_returns}
+            weights = self._solve(lambda weights: (weights @ self.cov_matrix @ weights, 2 * self.cov_matrix @ weights), initial_weights=weights, extra_constraints=[target_constraint])
+            weights_matrix[i] = weights
+
+        return {"weights": weights_matrix, **self.portfolio_statistics(weights_matrix)}
+
+    def random_portfolios(self, num_portfolios: int = 100_000, seed: Optional[int] = None) -> dict:
+        """Long-only weights drawn uniformly from the simplex (flat Dirichlet), evaluated in one batch."""
+        weights_matrix = np.random.default_rng(seed).dirichlet(np.ones(self.stock_len), size=num_portfolios)
+        return {"weights": weights_matrix, **self.portfolio_statistics(weights_matrix)}
+
+    def _solve(self, objective, initial_weights: Optional[np.ndarray] = None, extra_constraints: Optional[list] = None) -> np.ndarray:
+        """SLSQP with analytic gradients; objective returns (value, gradient)."""
+        initial_weights = np.full(self.stock_len, 1 / self.stock_len) if initial_weights is None else initial_weights
+        result = minimize(objective, initial_weights, jac=True, method="SLSQP", bounds=self.bounds,
+                          constraints=self.constraints + (extra_constraints or []), options={"maxiter": 500, "ftol": 1e-12})
+        if not result.success:
+            raise ValueError(f"Portfolio optimisation did not converge: {result.message}")
+        return result.x
+
+    def _describe(self, weights: np.ndarray) -> dict:
+        statistics = self.portfolio_statistics(weights)
+        return {"weights": weights, **{key: value[0] for key, value in statistics.items()}}
@@ -0,0 +1,83 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+# Utility
+from backend.utils.data_fetching import MonteCarlo_StockData
+from backend.utils.result_cache import ResultCache
+from typing import List, Optional, Union
+
+# Historical stress windows (start, end); the end date is exclusive, as in yf.download, so the rebound day that closed each window is left out
+STRESS_SCENARIOS = {
+    "2008_financial_crisis": ("2008-09-01", "2009-03-10"),
+    "2020_covid_crash": ("2020-02-19", "2020-03-24"),
+    "2022_rate_shock": ("2022-01-03", "2022-10-13")
+}
+
+# Scenario return panels keyed by stocks and window, shared by every StressTest
+scenario_cache = ResultCache(max_bytes=128 * 1024**2)
+
+class StressTest:
+    """
+    Replays historical stress windows against many portfolios at once.
+    Each scenario's daily return panel is downloaded once through MonteCarlo_StockData and cached; a matrix of portfolio weights is then applied to it with one matmul, with weights held constant through the window (as in MonteCarloSimulation).
+    Stocks that did not trade during a window (e.g. not yet listed) contribute a return of zero and are reported per scenario.
+
+    Inputs:
+        stock_list (List[str]): Stocks that the columns of the weight matrix refer to.
+        scenarios (None|List[str]): Names from STRESS_SCENARIOS to replay. If input == None, all of them are replayed.
+
+    Methods:
+        scenario_returns: Returns the cached daily return panel of a scenario.
+        run: Returns the cumulative return, maximum drawdown and worst day of every portfolio in every scenario, with losses in USD when portfolio values are given.
+    """
+    def __init__(self, stock_list: List[str], scenarios: Optional[List[str]] = None):
+        self.stocks = list(stock_list)
+        self.scenarios = list(STRESS_SCENARIOS) if scenarios is None else list(scenarios)
+        unknown = [name for name in self.scenarios if name not in STRESS_SCENARIOS]
+        if unknown:
+            raise ValueError(f"Unknown stress scenarios {unknown}. Use any of {list(STRESS_SCENARIOS)}.")
+
+    def scenario_returns(self, name: str) -> pd.DataFrame:
+        start, end = STRESS_SCENARIOS[name]
+        cache_key = scenario_cache.make_key(self.stocks, start, end)
+        returns = scenario_cache.get(cache_key)
+        if returns is None:
+            stock_data = MonteCarlo_StockData(stock_list=self.stocks, start_date=pd.Timestamp(start), end_date=pd.Timestamp(end))
+            returns = stock_data.returns.reindex(columns=self.stocks)
+            scenario_cache.put(cache_key, returns, returns.memory_usage(deep=True).sum())
+        return returns
+
+    def run(self, weights_matrix: Union[List[List[float]], np.ndarray], init_portfolio_value: Union[None, float, List[float]] = None) -> dict:
+        """
+        weights_matrix has one row of stock weights per portfolio, shape (num_portfolios, stock_len).
+        Returns, for each scenario, arrays of shape (num_portfolios,); losses are positive numbers.
+        """
+        weights_matrix = np.atleast_2d(np.asarray(weights_matrix, dtype=float))
+        if weights_matrix.shape[1] != len(self.stocks):
+            raise ValueError("Each row of weights must have one weight per stock in the portfolio.")
+
+        results = {}
+        for name in self.scenarios:
+            returns = self.scenario_returns(name)
+            if returns.empty:
+                raise ValueError(f"No price data is available for any stock during the {name} scenario.")
+            portfolio_returns = returns.fillna(0).to_numpy() @ weights_matrix.T # (days, num_portfolios)
+            portfolio_values = np.cumprod(1 + portfolio_returns, axis=0)
+            running_peak = np.maximum(np.maximum.accumulate(portfolio_values, axis=0), 1)
+
+            scenario_results = {
+                "start": STRESS_SCENARIOS[name][0],
+                "end": str(returns.index[-1].date()),
+                "num_days": len(returns),
+                "missing_stocks": [stock for stock in self.stocks if returns[stock].isna().all()],
+                "cumulative_return": portfolio_values[-1] - 1,
+                "max_drawdown": (1 - portfolio_values / running_peak).max(axis=0),
+                "worst_day_return": portfolio_returns.min(axis=0)
+            }
+            if init_portfolio_value is not None:
+                scenario_results["loss"] = -scenario_results["cumulative_return"] * np.asarray(init_portfolio_value, dtype=float)
+                scenario_results["max_drawdown_loss"] = scenario_results["max_drawdown"] * np.asarray(init_portfolio_value, dtype=float)
+            results[name] = scenario_results
+
+        return results
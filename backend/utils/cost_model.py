@@ -0,0 +1,160 @@
+# Imports
+import numpy as np
+from scipy.stats import norm, qmc
+
+# Utility
+from backend.monte_carlo import PARALLEL_BLOCK_SIZE, ADAPTIVE_BATCH_SIZE, MIN_ADAPTIVE_BATCHES
+from typing import Optional
+from time import perf_counter
+import warnings
+import os
+
+# Smallest chunk_size admission may switch a simulation to; below it, per-chunk overhead (and per-block pickling in parallel mode) dominates
+MIN_STREAM_CHUNK_SIZE = 1_000
+
+class SimulationCostModel:
+    """
+    Predicts the peak memory and CPU time of a MonteCarloSimulation before it runs, and decides whether to admit it.
+    Memory follows from the array shapes each mode allocates. Time is a per-element cost fitted by a small benchmark of the path kernel (draws, correlation matmul, cumulative products) at two portfolio sizes, so it reflects the machine it runs on.
+
+    Inputs:
+        memory_budget (int): Largest peak memory in bytes a single simulation may use.
+        max_interactive_seconds (float): Simulations predicted to take longer are queued and run one at a time.
+        max_seconds (float): Simulations predicted to take longer are rejected.
+
+    Methods:
+        calibrate: Times the path kernel to fit the per-element costs.
+        estimate: Returns the predicted peak memory (bytes) and time (seconds) of a simulation.
+        admit: Returns a decision ('accept', 'stream', 'queue' or 'reject'), the chunk_size to run with and the estimate.
+    """
+    def __init__(self, memory_budget: int = 2 * 1024**3, max_interactive_seconds: float = 10, max_seconds: float = 300):
+        self.memory_budget = memory_budget
+        self.max_interactive_seconds = max_interactive_seconds
+        self.max_seconds = max_seconds
+        # Seconds per path-day-stock, per path-day-stock per matmul column, and per Sobol dimension; replaced by calibrate
+        self.seconds_per_element = 2e-8
+        self.seconds_per_matmul_element = 5e-10
+        self.seconds_per_sobol_element = 1e-7
+        self.calibrated = False
+
+    def calibrate(self, time: int = 30, num_sim: int = 2_000) -> None:
+        small, large = 8, 64
+        small_seconds = self._time_kernel(time, num_sim, small) / (time * num_sim * small)
+        large_seconds = self._time_kernel(time, num_sim // 4, large) / (time * num_sim // 4 * large)
+        # Per element cost = seconds_per_element + seconds_per_matmul_element * stock_len
+        self.seconds_per_matmul_element = max((large_seconds - small_seconds) / (large - small), 1e-12)
+        self.seconds_per_element = max(small_seconds - self.seconds_per_matmul_element * small, 1e-12)
+
+        start = perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=UserWarning)
+            norm.ppf(np.clip(qmc.Sobol(d=time * small, seed=0).random(num_sim // 4), 1e-12, 1 - 1e-12))
+        self.seconds_per_sobol_element = (perf_counter() - start) / (time * num_sim // 4 * small)
+        self.calibrated = True
+
+    def estimate(self, stock_len: int, forecast_timeframe: int, num_simulations: int, chunk_size: Optional[int] = None, num_workers: Optional[int] = None,
+                 sampling_engine: str = "standard", target_relative_error: Optional[float] = None, max_simulations: int = 100_000,
+                 num_factors: Optional[int] = None, bootstrap: Optional[str] = None) -> dict:
+        """Peak memory and time of MonteCarloSimulation with these arguments; adaptive runs are costed at max_simulations, and num_workers is capped at the CPU count."""
+        if num_workers is not None:
+            num_workers = max(1, min(num_workers, os.cpu_count() or 1))
+        num_sim = max_simulations if target_relative_error is not None else num_simulations
+        shock_dimension = stock_len if num_factors is None else num_factors + 2 * stock_len # factor mode also scales the idiosyncratic shocks into a temporary
+        if bootstrap is not None:
+            shock_dimension = 1 # one historical day index per path-day
+        matmul_columns = 0 if bootstrap is not None else (stock_len if num_factors is None else num_factors)
+
+        def block_bytes(block_size: int, streamed: bool = True) -> int:
+            """
+            Shocks, daily returns compounded in place into stock paths, and portfolio paths of one block.
+            Sobol adds its uniforms and the clipped and inverse-CDF copies with their temporaries (measured at about 6 times the shocks); a streamed block adds the risk accumulator's temporary of one stock tensor.
+            """
+            per_path_day = shock_dimension + stock_len + 1 + (6 * shock_dimension if sampling_engine == "sobol" else 0) + (stock_len if streamed else 0)
+            return 8 * forecast_timeframe * block_size * per_path_day
+
+        stored_bytes = 8 * forecast_timeframe * num_sim * (stock_len + 1) # stock_sims_matrix and sims_matrix
+        if target_relative_error is not None:
+            batch_size = chunk_size or ADAPTIVE_BATCH_SIZE
+            peak_bytes = block_bytes(min(batch_size, num_sim)) + (0 if chunk_size is not None else 2 * stored_bytes) # batches and their concatenation
+        elif num_workers is not None:
+            block_size = chunk_size or PARALLEL_BLOCK_SIZE
+            workers_bytes = min(num_workers, -(-num_sim // block_size)) * block_bytes(min(block_size, num_sim))
+            peak_bytes = workers_bytes + (0 if chunk_size is not None else 2 * stored_bytes) # shared memory and its copy
+        elif chunk_size is not None:
+            peak_bytes = block_bytes(min(chunk_size, num_sim))
+        else:
+            peak_bytes = block_bytes(num_sim, streamed=False) + 8 * forecast_timeframe * num_sim # plus the percentile copy of sims_matrix
+
+        elements = forecast_timeframe * num_sim * stock_len
+        seconds = elements * (self.seconds_per_element + self.seconds_per_matmul_element * matmul_columns)
+        if sampling_engine == "sobol":
+            seconds += forecast_timeframe * num_sim * shock_dimension * self.seconds_per_sobol_element
+        if num_workers is not None:
+            seconds /= max(min(num_workers, -(-num_sim // (chunk_size or PARALLEL_BLOCK_SIZE))), 1)
+
+        return {"peak_bytes": int(peak_bytes), "seconds": float(seconds), "calibrated": self.calibrated}
+
+    def admit(self, **simulation_arguments) -> dict:
+        """
+        Accepts simulations within budget. If the memory budget is exceeded, switches to streaming with the largest chunk_size that fits, down to MIN_STREAM_CHUNK_SIZE (ADAPTIVE_BATCH_SIZE for adaptive runs, whose batches it sets); the control variate engine needs every final value, so it is rejected instead.
+        Simulations over max_interactive_seconds are queued, and simulations over max_seconds, still over the memory budget or with more num_workers than CPUs are rejected.
+        """
+        chunk_size = simulation_arguments.get("chunk_size")
+        estimate = self.estimate(**simulation_arguments)
+        decision = "accept"
+
+        num_workers = simulation_arguments.get("num_workers")
+        if num_workers is not None and not 1 <= num_workers <= (os.cpu_count() or 1):
+            return self._decision("reject", chunk_size, estimate, f"num_workers must be between 1 and the number of CPUs ({os.cpu_count() or 1}).")
+
+        if estimate["peak_bytes"] > self.memory_budget:
+            if simulation_arguments.get("sampling_engine", "standard") == "control_variate":
+                return self._decision("reject", chunk_size, estimate, "The control variate engine keeps every path and the simulation exceeds the memory budget.")
+            per_path_bytes = self.estimate(**{**simulation_arguments, "chunk_size": 1, "num_workers": None})["peak_bytes"]
+            workers = num_workers or 1
+            # Adaptive runs use chunk_size as their batch size over up to max_simulations paths: small batches give noisy stopping estimates,
+            # and at least MIN_ADAPTIVE_BATCHES batches must fit for the stopping rule to be checked
+            if simulation_arguments.get("target_relative_error") is not None:
+                max_simulations = simulation_arguments.get("max_simulations", 100_000)
+                min_chunk_size = min(max(MIN_STREAM_CHUNK_SIZE, ADAPTIVE_BATCH_SIZE), max_simulations)
+                num_sim = max(max_simulations // MIN_ADAPTIVE_BATCHES, min_chunk_size)
+            else:
+                num_sim = simulation_arguments["num_simulations"]
+                min_chunk_size = min(MIN_STREAM_CHUNK_SIZE, num_sim)
+            chunk_size = min(int(self.memory_budget // (per_path_bytes * workers)), num_sim)
+            if chunk_size < min_chunk_size:
+                return self._decision("reject", None, estimate, f"Even chunks of {min_chunk_size} paths exceed the memory budget.")
+            estimate = self.estimate(**{**simulation_arguments, "chunk_size": chunk_size})
+            decision = "stream"
+
+        if estimate["seconds"] > self.max_seconds:
+            return self._decision("reject", chunk_size, estimate, f"The simulation is estimated to take {estimate['seconds']:.0f} seconds, above the limit of {self.max_seconds:.0f} seconds.")
+        if estimate["seconds"] > self.max_interactive_seconds:
+            decision = "queue" if decision == "accept" else decision
+        return self._decision(decision, chunk_size, estimate, None)
+
+    def _decision(self, decision: str, chunk_size: Optional[int], estimate: dict, reason: Optional[str]) -> dict:
+        return {
+            "decision": decision,
+            "chunk_size": chunk_size,
+            "queued": estimate["seconds"] > self.max_interactive_seconds and decision != "reject",
+            "reason": reason,
+            **estimate,
+            "memory_budget": self.memory_budget
+        }
+
+    @staticmethod
+    def _time_kernel(time: int, num_sim: int, stock_len: int) -> float:
+        """Times the operations of MonteCarloSimulation._simulate_paths on a random covariance matrix."""
+        rng = np.random.default_rng(0)
+        returns = rng.normal(0, 0.01, size=(stock_len * 4, stock_len))
+        L = np.linalg.cholesky(np.cov(returns.T))
+        weights = np.full(stock_len, 1 / stock_len)
+
+        start = perf_counter()
+        Z = rng.standard_normal(size=(time, num_sim, stock_len))
+        daily_returns = (Z.reshape(-1, stock_len) @ L.T).reshape(Z.shape)
+        np.cumprod(daily_returns @ weights + 1, axis=0)
+        daily_returns += 1
+        np.cumprod(daily_returns, axis=0, out=daily_returns)
+        return perf_counter() - start
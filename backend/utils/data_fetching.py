@@ -2,12 +2,17 @@
 from bs4 import BeautifulSoup
 
 # Fetching Stock Data
-import yfinance as yf
 import datetime as dt
+import pandas as pd
 import requests
 
 # Utility
 from typing import List, Optional
+from hashlib import sha256
+from backend.utils.rolling_statistics import Incremental_ReturnStatistics
+from backend.utils.result_cache import ResultCache
+from backend.utils.price_store import get_price_store
+from backend.utils.ticker_universe import get_ticker_universe
 import os
 import requests
 import pickle
@@ -19,6 +24,14 @@ base_dir = os.path.dirname(os.path.abspath(__file__))
 utils_dir = os.path.abspath(os.path.join(base_dir, "..", "models"))
 name2ticker_path = os.path.join(utils_dir, "name2ticker_dict.pkl")
 
+# yfinance history periods as calendar days, for reading them from the price store ("ytd" and "max" are handled separately)
+HISTORY_PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 365, "2y": 730, "5y": 1826, "10y": 3653}
+
+# Spot prices and volatilities keyed by ticker and period, kept for SPOT_VOLATILITY_TTL seconds since spot prices move during the day
+SPOT_VOLATILITY_TTL = 60
+SPOT_VOLATILITY_ENTRY_BYTES = 64 # approximate size of one cached {"spot_price", "volatility"} entry
+spot_volatility_cache = ResultCache(max_bytes=16 * 1024**2, ttl=SPOT_VOLATILITY_TTL)
+
 class WebScraper:
     """
     Scrapes Yahoo Finance for relevant articles for a given stock.
@@ -90,17 +103,22 @@ class MonteCarlo_StockData:
         start_date (datetime): Historical start of time series for chosen stocks.
         end_date (datetime): Historical end of time series for chosen stocks, defaults to now.
         num_each_stock (List[int]|None): The shares of each stock. If None, defaults to 100.
+        statistics (None|Incremental_ReturnStatistics): If provided, only closes after its last date are downloaded and absorbed into it, and the mean price, mean returns, covariance, correlation and return history (returns) are taken from it (its window replaces start_date once it holds data). The updated object is kept as self.statistics, to be stored for the next refresh.
     
     Methods:
         get_key_data: Returns key financial information.
+        update_num_each_stock: Changes the shares of each stock without fetching data again.
+        snapshot_hash: Returns a hash of the fetched price statistics, identifying the data a simulation was run on.
     """
     def __init__(self, stock_list: List[str], 
                  start_date: dt.datetime = dt.datetime.now() - dt.timedelta(days=365), 
                  end_date: dt.datetime = dt.datetime.now(), 
-                 num_each_stock: Optional[List[int]] = None):
+                 num_each_stock: Optional[List[int]] = None,
+                 statistics: Optional[Incremental_ReturnStatistics] = None):
         self.stocks = stock_list
         self.start = start_date
         self.end = end_date
+        self.statistics = statistics
 
         self.mean_price, self.mean_returns, self.cov_matrix, self.corr_matrix = self._fetch_data()
         self.stock_len = len(self.mean_returns)
@@ -129,18 +147,37 @@ class MonteCarlo_StockData:
 
         return output
 
+    def update_num_each_stock(self, num_each_stock: List[float]) -> None:
+        if len(num_each_stock) != self.stock_len:
+            raise ValueError("Length of numbers provided does not match number of stocks in portfolio.")
+        self.num_each_stock = list(num_each_stock)
+        self.values, self.weights = self._find_weights()
+        self.port_value = sum(self.values)
+
+    def snapshot_hash(self) -> str:
+        snapshot = repr((self.stocks, self.mean_price, self.mean_returns)).encode() + self.cov_matrix.to_numpy().tobytes()
+        return sha256(snapshot).hexdigest()
+
     def _fetch_data(self) -> tuple:
-        df = yf.download(self.stocks, self.start, self.end)
-        # print(df)
-        df_close = df["Close"]
-        # print(df_close)
+        if self.statistics is not None:
+            return self._refresh_statistics()
+        df_close = get_price_store().get_closes(self.stocks, self.start, self.end)
         mean_price = df_close.mean()
         returns = df_close.pct_change()
+        self.returns = returns.iloc[1:] # daily return history (NaN where a stock did not trade), used by backtests and scenarios
         mean_returns = returns.mean()
         cov_matrix = returns.cov()
         corr_matrix = returns.corr()
         return list(mean_price), list(mean_returns), cov_matrix, corr_matrix 
 
+    def _refresh_statistics(self) -> tuple:
+        """Downloads only the closes the stored statistics have not seen and absorbs them one day at a time."""
+        start = self.start if self.statistics.last_date is None else pd.Timestamp(self.statistics.last_date) + pd.Timedelta(days=1)
+        if pd.Timestamp(start) < pd.Timestamp(self.end):
+            self.statistics.update_many(get_price_store().get_closes(self.stocks, start, self.end))
+        self.returns = self.statistics.returns() # return history of the statistics' window, for bootstrap and backtests
+        return self.statistics.mean_price(), self.statistics.mean_returns(), self.statistics.cov_matrix(), self.statistics.corr_matrix()
+
     # Based on shares and each stocks' mean price
     def _find_weights(self) -> tuple:
         values = [num * value for num, value in zip(self.num_each_stock, self.mean_price)]
@@ -150,46 +187,67 @@ class MonteCarlo_StockData:
 class Black_Scholes_Merton_StockData:
     """
     Obtains relevant stock data for Black Scholes Merton model.
+    Spot and volatility of any number of tickers come from one price store panel, whose provisional last bar is refetched once older than SPOT_VOLATILITY_TTL; results are cached for SPOT_VOLATILITY_TTL seconds, so repeated or overlapping requests (e.g. an options screen) do not fetch again.
 
     Inputs:
         ticker (str): Ticker of a chosen stock.
     
     Methods:
         get_spot_and_volatility: Calculates and returns the current spot and volatility of a chosen stock. Volatility period can be changed through period ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd" (year to date -> from start of current year) "max"].
+        get_spots_and_volatilities: Returns the spot and volatility of many tickers at once, as a DataFrame indexed by ticker.
     """
     def __init__(self, ticker: str):
         self.ticker = ticker
-        self.stock = yf.Ticker(ticker)
 
-    def _get_spot_price(self) -> float:
-        """Fetches the current spot price of the stock."""
-        try:
-            data = self.stock.history(period="1d")
-            spot_price = data['Close'].iloc[-1]  # Get the latest closing price
-            return spot_price
-        except Exception as e:
-            raise ValueError(f"Error retrieving spot price for {self.ticker}: {e}")
+    @staticmethod
+    def _period_start(period: str) -> dt.datetime:
+        """Start date of a yfinance-style period ending today."""
+        now = dt.datetime.now()
+        if period == "ytd":
+            return dt.datetime(now.year, 1, 1)
+        elif period == "max":
+            return dt.datetime(1970, 1, 1)
+        elif period in HISTORY_PERIOD_DAYS:
+            return now - dt.timedelta(days=HISTORY_PERIOD_DAYS[period])
+        raise ValueError(f"Invalid period. Use any of {list(HISTORY_PERIOD_DAYS) + ['ytd', 'max']}.")
 
-    def _get_volatility(self, period="6mo") -> float:
-        """Calculates annualised volatility based on historical price data."""
-        try:
-            data = self.stock.history(period=period)
-            daily_returns = data['Close'].pct_change().dropna()
-            daily_volatility = daily_returns.std()
-            annualized_volatility = daily_volatility * (126 ** 0.5)
-            return annualized_volatility
-        except Exception as e:
-            raise ValueError(f"Error retrieving volatility for {self.ticker}: {e}")
+    @staticmethod
+    def get_spots_and_volatilities(tickers: List[str], period: str = "6mo") -> pd.DataFrame:
+        """
+        Spot price (latest close) and annualised volatility of each ticker, with columns "spot_price" and "volatility". Tickers without data have NaN values.
+        Tickers missing from the cache are read in one panel covering both the volatility period and the last 5 days (weekends and holidays); today's close in it is at most SPOT_VOLATILITY_TTL seconds old, and the volatility is computed for every column at once.
+        """
+        period_start = pd.Timestamp(Black_Scholes_Merton_StockData._period_start(period)).normalize()
+        tickers = list(dict.fromkeys(tickers))
+        cached = {ticker: spot_volatility_cache.get(spot_volatility_cache.make_key(ticker, period)) for ticker in tickers}
+        missing = [ticker for ticker, values in cached.items() if values is None]
+
+        if missing:
+            now = dt.datetime.now()
+            start = min(period_start, pd.Timestamp(now - dt.timedelta(days=HISTORY_PERIOD_DAYS["5d"])).normalize())
+            df_close = get_price_store().get_closes(missing, start, now, provisional_ttl=SPOT_VOLATILITY_TTL).reindex(columns=missing)
+            spot_prices = df_close.ffill().iloc[-1] if len(df_close) else pd.Series(float("nan"), index=missing)
+            volatilities = df_close[df_close.index >= period_start].pct_change(fill_method=None).std() * (126 ** 0.5)
+            for ticker in missing:
+                cached[ticker] = {"spot_price": float(spot_prices[ticker]), "volatility": float(volatilities[ticker])}
+                spot_volatility_cache.put(spot_volatility_cache.make_key(ticker, period), cached[ticker], SPOT_VOLATILITY_ENTRY_BYTES)
+
+        return pd.DataFrame.from_dict(cached, orient="index", columns=["spot_price", "volatility"])
 
     def get_spot_and_volatility(self, period="6mo") -> dict:
         """Returns both spot price and volatility."""
-        spot_price = self._get_spot_price()
-        volatility = self._get_volatility(period)
-        return {"spot_price": spot_price, "volatility": volatility}
+        try:
+            values = self.get_spots_and_volatilities([self.ticker], period).loc[self.ticker]
+        except Exception as e:
+            raise ValueError(f"Error retrieving spot price and volatility for {self.ticker}: {e}")
+        if pd.isna(values["spot_price"]):
+            raise ValueError(f"Error retrieving spot price for {self.ticker}: no price data.")
+        return {"spot_price": float(values["spot_price"]), "volatility": float(values["volatility"])}
 
 class Finnhub:
     """
-    Static method to obtain tickers using Finnhub API. Uses tickers from NASDAQ.
+    Static method to obtain tickers using Finnhub API (through the current market data provider). Uses tickers from NASDAQ.
+    Tickers come from the persisted TickerUniverse, so only the first run waits on Finnhub; later listings are refreshed in the background.
 
     Inputs:
         api_key (str): Access key for Finnhub
@@ -199,16 +257,4 @@ class Finnhub:
     """
     @staticmethod
     def get_tickers(api_key: str) -> List[str]:
-        url = f"https://finnhub.io/api/v1/stock/symbol?exchange=US&token={api_key}"
-        response = requests.get(url)
-        tickers = response.json()
-
-        # Filter for NASDAQ tickers and collect symbol and company name
-        nasdaq_tickers = [
-            ticker["symbol"]
-            for ticker in tickers
-            if ticker["mic"] == "XNAS"
-        ]
-
-        nasdaq_tickers_sorted = sorted(nasdaq_tickers)
-        return nasdaq_tickers_sorted
+        return get_ticker_universe(api_key).symbols()
@@ -0,0 +1,218 @@
+# Imports
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# Utility
+from typing import List, Optional
+from time import sleep
+from threading import Lock
+from concurrent.futures import Future
+import datetime as dt
+import requests
+import os
+
+class MarketDataProvider:
+    """
+    Interface of every source of market data used by the data classes: daily close panels and the listing of symbols.
+
+    Methods:
+        download_closes: Returns daily closes of several tickers in [start, end), one column per ticker found.
+        list_symbols: Returns the listed symbols as records with "symbol", "mic" (exchange) and "description" keys.
+    """
+    name = "base"
+    persistent = True # whether the price store may keep this provider's data on disk across runs
+
+    def download_closes(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def list_symbols(self, api_key: Optional[str] = None) -> List[dict]:
+        raise NotImplementedError
+
+class YFinance_Provider(MarketDataProvider):
+    """
+    Live market data: closes from Yahoo Finance through yfinance, symbol listings from the Finnhub API.
+
+    Methods:
+        download_closes: Downloads daily closes with yf.download.
+        list_symbols: Requests the US symbol listing from Finnhub (requires an API key).
+    """
+    name = "yfinance"
+
+    def download_closes(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        df = yf.download(tickers, start, end, progress=False)
+        if df.empty:
+            return pd.DataFrame(index=pd.DatetimeIndex([]))
+        df_close = df["Close"]
+        if isinstance(df_close, pd.Series):
+            df_close = df_close.to_frame(tickers[0])
+        df_close.index = pd.DatetimeIndex(df_close.index).tz_localize(None).normalize()
+        return df_close
+
+    def list_symbols(self, api_key: Optional[str] = None) -> List[dict]:
+        url = f"https://finnhub.io/api/v1/stock/symbol?exchange=US&token={api_key}"
+        response = requests.get(url)
+        return response.json()
+
+class Replay_Provider(MarketDataProvider):
+    """
+    Offline market data served from a recorded or synthetic price panel, with optional artificial latency per call, so the full request path can be profiled without network access.
+
+    Inputs:
+        panel (pd.DataFrame): Daily closes with a date index and one column per ticker.
+        latency (float): Seconds to wait on every call, imitating a network round trip.
+        descriptions (None|dict): Company name per ticker for list_symbols. Defaults to the ticker itself.
+
+    Methods:
+        from_file: Loads a panel saved as Parquet or CSV.
+        synthetic: Generates prices for any tickers from a one-factor model of daily returns.
+        record: Downloads a panel from another provider and saves it for replay.
+        download_closes: Returns the recorded closes of the requested tickers in [start, end).
+        list_symbols: Returns every ticker of the panel as a NASDAQ listing.
+    """
+    name = "replay"
+    persistent = False
+
+    def __init__(self, panel: pd.DataFrame, latency: float = 0.0, descriptions: Optional[dict] = None):
+        self.panel = panel.sort_index()
+        self.panel.index = pd.DatetimeIndex(self.panel.index).normalize()
+        self.latency = latency
+        self.descriptions = descriptions or {}
+
+    @classmethod
+    def from_file(cls, path: str, latency: float = 0.0) -> "Replay_Provider":
+        if path.endswith(".parquet"):
+            panel = pd.read_parquet(path)
+        else:
+            panel = pd.read_csv(path, index_col=0, parse_dates=True)
+        return cls(panel, latency=latency)
+
+    @classmethod
+    def synthetic(cls, tickers: List[str], start: dt.datetime = dt.datetime(2000, 1, 1), end: Optional[dt.datetime] = None,
+                  latency: float = 0.0, seed: Optional[int] = 0) -> "Replay_Provider":
+        """Business-day prices driven by one market factor plus stock-specific noise, with annual drift 5-15% and volatility 20-45%."""
+        rng = np.random.default_rng(seed)
+        dates = pd.bdate_range(start, dt.datetime.now() if end is None else end)
+        market = rng.normal(0, 0.01, size=(len(dates), 1))
+        betas = rng.uniform(0.5, 1.5, size=len(tickers))
+        idiosyncratic_volatility = rng.uniform(0.2, 0.45, size=len(tickers)) / np.sqrt(252)
+        drift = rng.uniform(0.05, 0.15, size=len(tickers)) / 252
+        returns = drift + market * betas + rng.normal(0, 1, size=(len(dates), len(tickers))) * idiosyncratic_volatility
+        prices = rng.uniform(20, 500, size=len(tickers)) * np.cumprod(1 + returns, axis=0)
+        return cls(pd.DataFrame(prices, index=dates, columns=tickers), latency=latency)
+
+    @staticmethod
+    def record(provider: MarketDataProvider, tickers: List[str], start: dt.datetime, end: dt.datetime, path: str) -> None:
+        panel = provider.download_closes(tickers, pd.Timestamp(start), pd.Timestamp(end))
+        if path.endswith(".parquet"):
+            panel.to_parquet(path)
+        else:
+            panel.to_csv(path)
+
+    def download_closes(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        sleep(self.latency)
+        found = [ticker for ticker in tickers if ticker in self.panel.columns]
+        rows = (self.panel.index >= pd.Timestamp(start)) & (self.panel.index < pd.Timestamp(end))
+        return self.panel.loc[rows, found]
+
+    def list_symbols(self, api_key: Optional[str] = None) -> List[dict]:
+        sleep(self.latency)
+        return [{"symbol": ticker, "mic": "XNAS", "description": self.descriptions.get(ticker, ticker)} for ticker in self.panel.columns]
+
+class SingleFlight_Provider(MarketDataProvider):
+    """
+    Wraps another provider so that concurrent downloads share upstream calls.
+    A ticker and date range already being downloaded is not requested again: later callers wait for the in-flight result. Tickers requested by different callers within batch_window seconds are merged into one multi-ticker download covering the union of their ranges, and each caller receives its own slice.
+
+    Inputs:
+        provider (MarketDataProvider): Provider that performs the downloads.
+        batch_window (float): Seconds the first caller of a batch waits for other requests to join it.
+
+    Methods:
+        download_closes: Returns daily closes of several tickers in [start, end), sharing the download with concurrent callers.
+        list_symbols: Returns the listed symbols of the wrapped provider.
+    """
+    def __init__(self, provider: MarketDataProvider, batch_window: float = 0.05):
+        self.provider = provider
+        self.name = provider.name
+        self.persistent = provider.persistent
+        self.batch_window = batch_window
+        self.upstream_calls = 0
+        self._lock = Lock()
+        self._in_flight = {} # (ticker, start, end) -> Future of the ticker's closes
+        self._batch = None # (ticker, start, end, Future) waiting for the next download
+
+    def download_closes(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        futures, leader = {}, False
+        with self._lock:
+            for ticker in dict.fromkeys(tickers):
+                key = (ticker, start, end)
+                if key not in self._in_flight:
+                    self._in_flight[key] = Future()
+                    if self._batch is None:
+                        self._batch, leader = [], True
+                    self._batch.append((ticker, start, end, self._in_flight[key]))
+                futures[ticker] = self._in_flight[key]
+
+        if leader:
+            sleep(self.batch_window)
+            with self._lock:
+                batch, self._batch = self._batch, None
+            self._download(batch)
+
+        closes = {ticker: future.result() for ticker, future in futures.items()}
+        closes = {ticker: series for ticker, series in closes.items() if series is not None}
+        if not closes:
+            return pd.DataFrame(index=pd.DatetimeIndex([]))
+        return pd.concat(closes, axis=1)
+
+    def list_symbols(self, api_key: Optional[str] = None) -> List[dict]:
+        return self.provider.list_symbols(api_key)
+
+    def _download(self, batch: list) -> None:
+        """One upstream call for every ticker of the batch over the union of their ranges; tickers not found resolve to None."""
+        try:
+            tickers = list(dict.fromkeys(ticker for ticker, _, _, _ in batch))
+            df_close = self.provider.download_closes(tickers, min(start for _, start, _, _ in batch), max(end for _, _, end, _ in batch))
+            self.upstream_calls += 1
+            for ticker, start, end, future in batch:
+                if ticker in df_close:
+                    future.set_result(df_close.loc[(df_close.index >= start) & (df_close.index < end), ticker])
+                else:
+                    future.set_result(None)
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                for ticker, start, end, _ in batch:
+                    self._in_flight.pop((ticker, start, end), None)
+
+_provider: Optional[MarketDataProvider] = None
+
+def get_provider() -> MarketDataProvider:
+    """
+    Returns the provider used by every data class, created on first use from the environment:
+    MARKET_DATA_PROVIDER = "yfinance" (default) or "replay"; for replay, MARKET_DATA_REPLAY_PATH (Parquet or CSV panel, synthetic prices for MARKET_DATA_REPLAY_TICKERS if unset) and MARKET_DATA_LATENCY (seconds).
+    The provider is wrapped in SingleFlight_Provider, with MARKET_DATA_BATCH_WINDOW (seconds, default 0.05) as its batch window.
+    """
+    global _provider
+    if _provider is None:
+        if os.environ.get("MARKET_DATA_PROVIDER", "yfinance") == "replay":
+            latency = float(os.environ.get("MARKET_DATA_LATENCY", 0))
+            if "MARKET_DATA_REPLAY_PATH" in os.environ:
+                _provider = Replay_Provider.from_file(os.environ["MARKET_DATA_REPLAY_PATH"], latency=latency)
+            else:
+                tickers = os.environ.get("MARKET_DATA_REPLAY_TICKERS", "AAPL,TSLA,AMZN,MSFT,NVDA,GOOGL,META").split(",")
+                _provider = Replay_Provider.synthetic(tickers, latency=latency)
+        else:
+            _provider = YFinance_Provider()
+        _provider = SingleFlight_Provider(_provider, batch_window=float(os.environ.get("MARKET_DATA_BATCH_WINDOW", 0.05)))
+    return _provider
+
+def set_provider(provider: MarketDataProvider) -> None:
+    """Replaces the provider used by every data class, e.g. with a Replay_Provider in benchmarks and load tests. Concurrent downloads are coalesced as in get_provider."""
+    global _provider
+    _provider = provider if isinstance(provider, SingleFlight_Provider) else SingleFlight_Provider(provider, batch_window=float(os.environ.get("MARKET_DATA_BATCH_WINDOW", 0.05)))
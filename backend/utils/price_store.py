@@ -0,0 +1,125 @@
+# Imports
+import pandas as pd
+
+# Utility
+from backend.utils.market_data import MarketDataProvider, get_provider
+from typing import List, Optional, Tuple
+from threading import Lock
+import datetime as dt
+import json
+import os
+import tempfile
+
+# Directory of the on-disk price stores (one folder per provider), one Parquet file of daily closes per ticker
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_store_dir = os.environ.get("PRICE_STORE_DIR", os.path.abspath(os.path.join(base_dir, "..", "data", "price_store")))
+
+# Seconds before today's provisional close is fetched again
+PROVISIONAL_CLOSE_TTL = float(os.environ.get("PROVISIONAL_CLOSE_TTL", 15 * 60))
+
+class PriceStore:
+    """
+    Local store of daily close prices, keyed by ticker and date, that downloads only the date ranges it has not covered yet.
+    Each ticker is a Parquet file read with memory mapping; coverage.json records the date range already fetched per ticker, so days without trading (weekends, holidays, before listing) are not requested again.
+    Today's close is provisional: it is never marked as covered, and is fetched again once the last fetch of the ticker is older than PROVISIONAL_CLOSE_TTL, so history is served from disk while the latest bar stays fresh.
+
+    Inputs:
+        directory (str): Folder holding the Parquet files and coverage.json.
+        provider (MarketDataProvider): Source of the missing closes.
+
+    Methods:
+        get_closes: Returns daily closes of several tickers between two dates, fetching only the missing ranges.
+        missing_ranges: Returns the date ranges of a ticker that would be downloaded for a request.
+    """
+    def __init__(self, directory: str, provider: MarketDataProvider):
+        self.directory = directory
+        self.provider = provider
+        os.makedirs(self.directory, exist_ok=True)
+        self.coverage_path = os.path.join(self.directory, "coverage.json")
+        self._lock = Lock()
+        self.coverage = {}
+        if os.path.exists(self.coverage_path):
+            with open(self.coverage_path) as f:
+                self.coverage = {ticker: tuple(pd.Timestamp(date) for date in dates) for ticker, dates in json.load(f).items()}
+
+    def get_closes(self, tickers: List[str], start: dt.datetime, end: Optional[dt.datetime] = None, provisional_ttl: Optional[float] = None) -> pd.DataFrame:
+        """
+        Daily closes with one column per ticker, in the order given, for dates in [start, end), as with yf.download: a date-only end is excluded, while an end with a time of day (e.g. now) includes that day's bar.
+        end defaults to now. provisional_ttl overrides PROVISIONAL_CLOSE_TTL for this request, e.g. for callers that need a current spot price.
+        """
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(dt.datetime.now() if end is None else end).ceil("D")
+
+        with self._lock:
+            # Tickers missing the same range are downloaded together
+            requests = {}
+            for ticker in tickers:
+                for missing_range in self.missing_ranges(ticker, start, end, provisional_ttl):
+                    requests.setdefault(missing_range, []).append(ticker)
+
+        # Downloads run outside the lock, so concurrent requests reach the provider together and share its calls
+        for (missing_start, missing_end), missing_tickers in requests.items():
+            df_close = self.provider.download_closes(missing_tickers, missing_start, missing_end)
+            with self._lock:
+                self._merge(missing_tickers, missing_start, missing_end, df_close)
+
+        with self._lock:
+            closes = pd.concat({ticker: self._read(ticker) for ticker in tickers}, axis=1)
+        closes = closes[(closes.index >= start) & (closes.index < end)]
+        return closes.dropna(how="all")
+
+    def missing_ranges(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp, provisional_ttl: Optional[float] = None) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        today = pd.Timestamp(dt.datetime.now()).normalize()
+        end = min(end, today + pd.Timedelta(days=1)) # future days cannot be fetched yet
+        if ticker not in self.coverage:
+            return [(start, end)] if start < end else []
+        covered_start, covered_end, fetched_at = self.coverage[ticker]
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        recently_fetched = pd.Timestamp(dt.datetime.now()) - fetched_at < pd.Timedelta(seconds=PROVISIONAL_CLOSE_TTL if provisional_ttl is None else provisional_ttl)
+        if end > covered_end and not (covered_end >= today and recently_fetched): # only today's provisional close is missing
+            ranges.append((covered_end, end))
+        return ranges
+
+    def _merge(self, tickers: List[str], start: pd.Timestamp, end: pd.Timestamp, df_close: pd.DataFrame) -> None:
+        """Merges one downloaded range of several tickers into their files and extends their coverage to include it."""
+        for ticker in tickers:
+            new_closes = df_close[ticker].dropna() if ticker in df_close else pd.Series(dtype=float)
+            closes = pd.concat([self._read(ticker), new_closes])
+            closes = closes[~closes.index.duplicated(keep="last")].sort_index()
+            temporary_path = self._path(ticker) + ".tmp"
+            closes.rename("Close").to_frame().to_parquet(temporary_path)
+            os.replace(temporary_path, self._path(ticker))
+
+            # Coverage stops before today, whose close may still change; the fetch time decides when it is refreshed
+            now = pd.Timestamp(dt.datetime.now())
+            today = now.normalize()
+            covered_start, covered_end, _ = self.coverage.get(ticker, (start, min(end, today), now))
+            self.coverage[ticker] = (min(start, covered_start), max(min(end, today), covered_end), now)
+
+        temporary_path = self.coverage_path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({ticker: [str(covered_start.date()), str(covered_end.date()), fetched_at.isoformat()] for ticker, (covered_start, covered_end, fetched_at) in self.coverage.items()}, f)
+        os.replace(temporary_path, self.coverage_path)
+
+    def _read(self, ticker: str) -> pd.Series:
+        if not os.path.exists(self._path(ticker)):
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+        return pd.read_parquet(self._path(ticker), memory_map=True)["Close"]
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.directory, f"{ticker.replace('/', '_')}.parquet")
+
+_price_stores = {}
+
+def get_price_store() -> PriceStore:
+    """
+    Returns the price store of the current market data provider.
+    Each provider has its own folder under PRICE_STORE_DIR (default backend/data/price_store); non-persistent providers such as replay panels use a temporary folder per process.
+    """
+    provider = get_provider()
+    if id(provider) not in _price_stores:
+        directory = os.path.join(default_store_dir, provider.name) if provider.persistent else tempfile.mkdtemp(prefix=f"price_store_{provider.name}_")
+        _price_stores[id(provider)] = PriceStore(directory, provider)
+    return _price_stores[id(provider)]
@@ -0,0 +1,79 @@
+# Imports
+from collections import OrderedDict
+from threading import Lock
+
+# Utility
+from typing import Any, Optional
+from hashlib import sha256
+from time import monotonic
+import json
+
+class ResultCache:
+    """
+    Content-addressed, memory-bounded LRU cache for finished results (e.g. Monte Carlo simulations).
+
+    Inputs:
+        max_bytes (int): Memory budget. Least recently used entries are evicted once the total size of stored entries exceeds it.
+        ttl (None|float): Seconds an entry stays valid after it is stored. If input == None, entries never expire.
+
+    Methods:
+        make_key: Hashes any JSON-serialisable parts (request, data snapshot, seed) into a cache key.
+        get: Returns the cached value for a key, or None on a miss.
+        put: Stores a value with its size in bytes, evicting old entries as needed.
+        clear: Removes every entry.
+        stats: Returns hit, miss and eviction counters along with current usage.
+    """
+    def __init__(self, max_bytes: int = 512 * 1024**2, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (value, nbytes, expiry time), least recently used first
+        self._lock = Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        serialised = json.dumps(parts, sort_keys=True, default=str)
+        return sha256(serialised.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries and self._entries[key][2] <= monotonic(): # expired
+                self.current_bytes -= self._entries.pop(key)[1]
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key: str, value: Any, nbytes: int) -> None:
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if nbytes > self.max_bytes: # would evict everything and still not fit
+                return
+            self._entries[key] = (value, nbytes, float("inf") if self.ttl is None else monotonic() + self.ttl)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
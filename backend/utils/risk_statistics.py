@@ -0,0 +1,363 @@
+# Imports
+import numpy as np
+from scipy.stats import chi2
+from scipy.special import xlogy
+
+# Utility
+from backend.utils.quantile_sketch import KLL_QuantileSketch
+from typing import Tuple, Optional, List, Union
+
+class MonteCarlo_RiskAccumulator:
+    """
+    Accumulates Monte Carlo statistics chunk by chunk so that the full simulation tensor never has to be held in memory.
+
+    Inputs:
+        forecast_timeframe (int): Number of simulated days per path.
+        stock_len (int): Number of stocks in the portfolio.
+        num_simulations (int): Total number of paths that will be fed in. Used to size the exact VaR tail buffer.
+        var_percentile (float): Percentile of the final value distribution used for VaR and CVaR, defaults to 5.
+        num_bins (int): Number of bins of the final value histogram.
+        num_sample_paths (int): Number of portfolio paths kept for plotting.
+        sketch_k (None|int): If provided, a KLL quantile sketch per day replaces the exact VaR tail buffer, so VaR, CVaR and percentiles use constant memory (see KLL_QuantileSketch for error bounds).
+        seed (None|int|np.random.SeedSequence): Seed of the sketch's random compactions.
+
+    Methods:
+        update: Absorbs a chunk of simulated portfolio and stock paths.
+        merge: Combines the statistics of another accumulator into this one.
+        mean_final_value: Mean of the final portfolio values.
+        std_final_value: Population standard deviation of the final portfolio values.
+        average_path: Mean portfolio value per day.
+        average_stock_prices: Mean price per day of each stock.
+        value_at_risk: VaR of the final portfolio values, identical to np.percentile over all values.
+        conditional_value_at_risk: Mean of the final portfolio values at or below the VaR.
+        histogram: Counts and bin edges of the final portfolio values.
+        approximate_percentiles: Percentiles of the final portfolio values from the sketch, or interpolated from the histogram.
+        path_percentiles: Percentiles of the portfolio value for every day, from the sketch.
+        standard_errors: Batch-means standard errors of the mean, VaR and CVaR, one batch per chunk.
+    """
+    def __init__(self, forecast_timeframe: int, stock_len: int, num_simulations: int, var_percentile: float = 5,
+                 num_bins: int = 30, num_sample_paths: int = 100, sketch_k: Optional[int] = None,
+                 seed: Union[None, int, np.random.SeedSequence] = None):
+        self.time = forecast_timeframe
+        self.stock_len = stock_len
+        self.num_sim = num_simulations
+        self.var_percentile = var_percentile
+        self.num_bins = num_bins
+        self.num_sample_paths = num_sample_paths
+
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0 # sum of squared deviations from the mean
+        self._path_sum = np.zeros(self.time)
+        self._stock_path_sum = np.zeros((self.time, self.stock_len))
+        self.path_min = np.inf
+        self.path_max = -np.inf
+
+        # Only the lowest values are needed for an exact percentile in the left tail
+        self._tail_size = int(np.floor(self.var_percentile / 100 * (self.num_sim - 1))) + 2
+        self._tail = np.empty(0)
+
+        self.sketch_k = sketch_k
+        self.path_sketch = KLL_QuantileSketch(sketch_k, num_rows=self.time, seed=seed) if sketch_k is not None else None
+
+        self.bin_edges = None
+        self.bin_counts = np.zeros(self.num_bins, dtype=np.int64)
+        self.sample_paths = np.empty((self.time, 0))
+
+        # (mean, VaR, CVaR) of each chunk, used for batch-means standard errors
+        self.batch_estimates: List[Tuple[float, float, float]] = []
+
+    def update(self, sims_chunk: np.ndarray, stock_sims_chunk: np.ndarray) -> None:
+        """Absorbs portfolio paths of shape (time, m) and stock paths of shape (time, m, stock_len)."""
+        final_values = sims_chunk[-1]
+        self._update_moments(final_values)
+
+        self._path_sum += sims_chunk.sum(axis=1)
+        self._stock_path_sum += stock_sims_chunk.sum(axis=1)
+        self.path_min = min(self.path_min, sims_chunk.min())
+        self.path_max = max(self.path_max, sims_chunk.max())
+
+        if self.path_sketch is not None:
+            self.path_sketch.update(sims_chunk)
+        else:
+            self._update_tail(final_values)
+        self._update_histogram(final_values)
+        self.batch_estimates.append(risk_estimates(final_values, self.var_percentile))
+
+        missing_paths = self.num_sample_paths - self.sample_paths.shape[1]
+        if missing_paths > 0:
+            self.sample_paths = np.hstack([self.sample_paths, sims_chunk[:, :missing_paths]])
+
+    def merge(self, other: "MonteCarlo_RiskAccumulator") -> None:
+        """Combines another accumulator, e.g. one filled by a separate worker, into this one."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta**2 * self.count * other.count / total
+        self._mean += delta * other.count / total
+        self.count = total
+
+        self._path_sum += other._path_sum
+        self._stock_path_sum += other._stock_path_sum
+        self.path_min = min(self.path_min, other.path_min)
+        self.path_max = max(self.path_max, other.path_max)
+
+        if self.path_sketch is not None:
+            self.path_sketch.merge(other.path_sketch)
+        else:
+            self._update_tail(other._tail)
+        if self.bin_edges is None:
+            self.bin_edges = other.bin_edges
+            self.bin_counts = other.bin_counts.copy()
+        elif other.bin_edges is not None:
+            # Re-bin the other histogram by its bin centres when the edges differ
+            centres = (other.bin_edges[:-1] + other.bin_edges[1:]) / 2
+            self.bin_counts += np.histogram(np.clip(centres, self.bin_edges[0], self.bin_edges[-1]), bins=self.bin_edges, weights=other.bin_counts)[0].astype(np.int64)
+
+        missing_paths = self.num_sample_paths - self.sample_paths.shape[1]
+        if missing_paths > 0:
+            self.sample_paths = np.hstack([self.sample_paths, other.sample_paths[:, :missing_paths]])
+
+        self.batch_estimates.extend(other.batch_estimates)
+
+    def mean_final_value(self) -> float:
+        return self._mean
+
+    def std_final_value(self) -> float:
+        return np.sqrt(self._m2 / self.count)
+
+    def average_path(self) -> np.ndarray:
+        return self._path_sum / self.count
+
+    def average_stock_prices(self) -> np.ndarray:
+        return self._stock_path_sum / self.count
+
+    def value_at_risk(self) -> float:
+        """Linear interpolation between order statistics, matching np.percentile, or the sketch estimate."""
+        if self.path_sketch is not None:
+            return self.path_sketch.quantiles(self.var_percentile / 100)[0, -1]
+        tail = np.sort(self._tail)
+        position = self.var_percentile / 100 * (self.count - 1)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, len(tail) - 1)
+        return tail[lower] + (position - lower) * (tail[upper] - tail[lower])
+
+    def conditional_value_at_risk(self) -> float:
+        VaR = self.value_at_risk()
+        if self.path_sketch is not None:
+            return self.path_sketch.tail_mean(np.full(self.time, VaR))[-1]
+        return self._tail[self._tail <= VaR].mean()
+
+    def histogram(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.bin_counts, self.bin_edges
+
+    def approximate_percentiles(self, percentiles: List[float]) -> np.ndarray:
+        """Percentiles of the final values from the sketch, or interpolated from the histogram (exact only up to the bin width)."""
+        if self.path_sketch is not None:
+            return self.path_sketch.quantiles(np.asarray(percentiles) / 100)[:, -1]
+        cdf = np.concatenate([[0], np.cumsum(self.bin_counts)]) / self.bin_counts.sum()
+        return np.interp(np.asarray(percentiles) / 100, cdf, self.bin_edges)
+
+    def path_percentiles(self, percentiles: List[float]) -> np.ndarray:
+        """Returns percentiles of the portfolio value of shape (len(percentiles), time). Requires sketch_k."""
+        if self.path_sketch is None:
+            raise ValueError("Per-day percentiles need a quantile sketch (sketch_k).")
+        return self.path_sketch.quantiles(np.asarray(percentiles) / 100)
+
+    def standard_errors(self) -> Tuple[float, float, float]:
+        """Batch-means standard errors of (mean, VaR, CVaR), treating each chunk as one batch. NaN with fewer than two chunks."""
+        return batch_means_standard_errors(self.batch_estimates)
+
+    def _update_moments(self, values: np.ndarray) -> None:
+        """Chan et al. parallel update of the mean and sum of squared deviations."""
+        n = len(values)
+        chunk_mean = values.mean()
+        chunk_m2 = ((values - chunk_mean)**2).sum()
+        total = self.count + n
+        delta = chunk_mean - self._mean
+        self._m2 += chunk_m2 + delta**2 * self.count * n / total
+        self._mean += delta * n / total
+        self.count = total
+
+    def _update_tail(self, values: np.ndarray) -> None:
+        combined = np.concatenate([self._tail, values])
+        if len(combined) > self._tail_size:
+            combined = np.partition(combined, self._tail_size - 1)[:self._tail_size]
+        self._tail = combined
+
+    def _update_histogram(self, values: np.ndarray) -> None:
+        # Bin edges are fixed by the first chunk; later values beyond them fall into the outer bins
+        if self.bin_edges is None:
+            lower = min(values.min(), values.mean() - 4 * values.std())
+            upper = max(values.max(), values.mean() + 4 * values.std(), lower + 1e-9)
+            self.bin_edges = np.linspace(lower, upper, self.num_bins + 1)
+        clipped = np.clip(values, self.bin_edges[0], self.bin_edges[-1])
+        self.bin_counts += np.histogram(clipped, bins=self.bin_edges)[0]
+
+class MonteCarlo_Summary:
+    """
+    Every aggregate the Monte Carlo plots and endpoints need, computed once per simulation.
+
+    Inputs:
+        average_path (np.ndarray): Mean portfolio value per day, shape (time,).
+        average_stock_prices (np.ndarray): Mean price per day of each stock, shape (time, stock_len).
+        path_min (float): Lowest simulated portfolio value.
+        path_max (float): Highest simulated portfolio value.
+        mean_final_value (float): Mean final portfolio value.
+        std_final_value (float): Standard deviation of the final portfolio values.
+        VaR_5 (float): 5% Value at Risk of the final portfolio values.
+        CVaR_5 (float): 5% Conditional Value at Risk of the final portfolio values.
+        sharpe_ratio (float): (mean final value - initial value) / standard deviation.
+        final_value_percentiles (dict): Percentile -> final portfolio value.
+        histogram_counts (np.ndarray): Counts of the final value histogram.
+        histogram_edges (np.ndarray): Bin edges of the final value histogram.
+        path_percentiles (None|dict): Percentile -> portfolio value per day, for fan charts. None in streaming mode without a quantile sketch.
+        sample_paths (np.ndarray): A few representative portfolio paths of shape (time, n).
+
+    Methods:
+        to_dict: Returns the summary as JSON-serialisable lists and floats.
+    """
+    def __init__(self, average_path: np.ndarray, average_stock_prices: np.ndarray, path_min: float, path_max: float,
+                 mean_final_value: float, std_final_value: float, VaR_5: float, CVaR_5: float, sharpe_ratio: float,
+                 final_value_percentiles: dict, histogram_counts: np.ndarray, histogram_edges: np.ndarray,
+                 path_percentiles: Optional[dict], sample_paths: np.ndarray):
+        self.average_path = average_path
+        self.average_stock_prices = average_stock_prices
+        self.path_min = path_min
+        self.path_max = path_max
+        self.mean_final_value = mean_final_value
+        self.std_final_value = std_final_value
+        self.VaR_5 = VaR_5
+        self.CVaR_5 = CVaR_5
+        self.sharpe_ratio = sharpe_ratio
+        self.final_value_percentiles = final_value_percentiles
+        self.histogram_counts = histogram_counts
+        self.histogram_edges = histogram_edges
+        self.path_percentiles = path_percentiles
+        self.sample_paths = sample_paths
+
+    def to_dict(self) -> dict:
+        return {
+            "average_path": self.average_path.tolist(),
+            "average_stock_prices": self.average_stock_prices.tolist(),
+            "path_min": float(self.path_min),
+            "path_max": float(self.path_max),
+            "mean_final_value": float(self.mean_final_value),
+            "std_final_value": float(self.std_final_value),
+            "VaR_5": float(self.VaR_5),
+            "CVaR_5": float(self.CVaR_5),
+            "sharpe_ratio": float(self.sharpe_ratio),
+            "final_value_percentiles": {str(percentile): float(value) for percentile, value in self.final_value_percentiles.items()},
+            "histogram_counts": self.histogram_counts.tolist(),
+            "histogram_edges": self.histogram_edges.tolist(),
+            "path_percentiles": None if self.path_percentiles is None else {str(percentile): values.tolist() for percentile, values in self.path_percentiles.items()},
+            "sample_paths": self.sample_paths.T.tolist()
+        }
+
+def risk_estimates(values: np.ndarray, var_percentile: float = 5, weights: Optional[np.ndarray] = None) -> Tuple[float, float, float]:
+    """
+    Returns (mean, VaR, CVaR) of a sample of final portfolio values.
+    Without weights, VaR matches np.percentile. With weights (e.g. control variate weights summing to 1), VaR is the smallest value whose weighted CDF reaches the percentile.
+    """
+    if weights is None:
+        VaR = np.percentile(values, var_percentile)
+        return values.mean(), VaR, values[values <= VaR].mean()
+
+    order = np.argsort(values)
+    sorted_values, sorted_weights = values[order], weights[order]
+    cdf = np.cumsum(sorted_weights)
+    var_index = min(np.searchsorted(cdf, var_percentile / 100), len(values) - 1)
+    VaR = sorted_values[var_index]
+    tail_weights = sorted_weights[:var_index + 1]
+    CVaR = (tail_weights @ sorted_values[:var_index + 1]) / tail_weights.sum()
+    return weights @ values, VaR, CVaR
+
+def control_variate_weights(control: np.ndarray, control_mean: float) -> np.ndarray:
+    """
+    Regression weights that make the weighted sample mean of the control equal its known expectation (Hesterberg & Nelson, 1998).
+    Applying them to the empirical distribution of a correlated output reduces the variance of its mean and quantile estimates.
+    """
+    deviations = control - control.mean()
+    sum_of_squares = deviations @ deviations
+    if sum_of_squares == 0:
+        return np.full(len(control), 1 / len(control))
+    return 1 / len(control) - deviations * (control.mean() - control_mean) / sum_of_squares
+
+def batch_means_standard_errors(batch_estimates: List[Tuple[float, ...]]) -> Tuple[float, ...]:
+    """Standard error of each estimate from independent batch estimates: std(batches) / sqrt(number of batches)."""
+    estimates = np.asarray(batch_estimates, dtype=float)
+    if len(estimates) < 2:
+        return tuple([np.nan] * (estimates.shape[1] if estimates.ndim == 2 else 3))
+    return tuple(estimates.std(axis=0, ddof=1) / np.sqrt(len(estimates)))
+
+def portfolio_risk_metrics(final_values: np.ndarray, init_portfolio_value: float, var_percentile: float = 5) -> dict:
+    """Column-wise VaR, CVaR, mean, standard deviation and Sharpe ratio of final values of shape (num_sim, num_portfolios)."""
+    VaR = np.percentile(final_values, var_percentile, axis=0)
+    tail = final_values <= VaR
+    CVaR = (final_values * tail).sum(axis=0) / tail.sum(axis=0)
+    mean = final_values.mean(axis=0)
+    std = final_values.std(axis=0)
+    return {
+        "VaR_5": VaR,
+        "CVaR_5": CVaR,
+        "mean_final_value": mean,
+        "std_final_value": std,
+        "sharpe_ratio": (mean - init_portfolio_value) / std
+    }
+
+def risk_term_structure(sims_matrix: np.ndarray, percentiles: List[float], var_percentile: float = 5) -> dict:
+    """
+    VaR, CVaR and percentiles of the portfolio value for every day of sims_matrix (time, num_sim) at once.
+    A single np.partition over the needed order statistics replaces a full sort per day; interpolation matches np.percentile.
+    """
+    num_sim = sims_matrix.shape[1]
+    all_percentiles = np.asarray(list(percentiles) + [var_percentile], dtype=float)
+    positions = all_percentiles / 100 * (num_sim - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, num_sim - 1)
+
+    partitioned = np.partition(sims_matrix, np.unique(np.concatenate([lower, upper])), axis=1)
+    values = partitioned[:, lower] + (positions - lower) * (partitioned[:, upper] - partitioned[:, lower])
+
+    # Everything left of the VaR order statistic is at or below it, so CVaR needs no further sorting
+    var_lower = lower[-1]
+    VaR = values[:, -1]
+    tail = partitioned[:, :var_lower + 1]
+    tail_mask = tail <= VaR[:, np.newaxis]
+    CVaR = (tail * tail_mask).sum(axis=1) / np.maximum(tail_mask.sum(axis=1), 1)
+
+    return {
+        "horizon_days": np.arange(1, sims_matrix.shape[0] + 1),
+        "VaR": VaR,
+        "CVaR": CVaR,
+        "percentiles": {percentile: values[:, index] for index, percentile in enumerate(percentiles)}
+    }
+
+def kupiec_pof_test(num_exceptions: int, num_observations: int, var_percentile: float = 5) -> Tuple[float, float]:
+    """Kupiec (1995) proportion of failures test: (likelihood ratio, p-value) that the exception rate equals var_percentile, chi-squared with 1 degree of freedom."""
+    p = var_percentile / 100
+    observed_rate = num_exceptions / num_observations
+    num_passes = num_observations - num_exceptions
+    log_likelihood_null = xlogy(num_passes, 1 - p) + xlogy(num_exceptions, p)
+    log_likelihood_observed = xlogy(num_passes, 1 - observed_rate) + xlogy(num_exceptions, observed_rate)
+    likelihood_ratio = -2 * (log_likelihood_null - log_likelihood_observed)
+    return likelihood_ratio, chi2.sf(likelihood_ratio, df=1)
+
+def christoffersen_independence_test(exceptions: np.ndarray) -> Tuple[float, float]:
+    """
+    Christoffersen (1998) independence test: (likelihood ratio, p-value) that an exception today is as likely after an exception as after a pass, chi-squared with 1 degree of freedom.
+    Adding the Kupiec statistic gives the conditional coverage test with 2 degrees of freedom.
+    """
+    exceptions = np.asarray(exceptions, dtype=bool)
+    previous, current = exceptions[:-1], exceptions[1:]
+    n00, n01 = np.sum(~previous & ~current), np.sum(~previous & current)
+    n10, n11 = np.sum(previous & ~current), np.sum(previous & current)
+
+    pi = (n01 + n11) / max(n00 + n01 + n10 + n11, 1)
+    pi0 = n01 / max(n00 + n01, 1)
+    pi1 = n11 / max(n10 + n11, 1)
+    log_likelihood_null = xlogy(n00 + n10, 1 - pi) + xlogy(n01 + n11, pi)
+    log_likelihood_markov = xlogy(n00, 1 - pi0) + xlogy(n01, pi0) + xlogy(n10, 1 - pi1) + xlogy(n11, pi1)
+    likelihood_ratio = -2 * (log_likelihood_null - log_likelihood_markov)
+    return likelihood_ratio, chi2.sf(likelihood_ratio, df=1)
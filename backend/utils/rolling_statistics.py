@@ -0,0 +1,162 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+# Utility
+from typing import List, Optional
+from collections import deque
+
+class Incremental_ReturnStatistics:
+    """
+    Mean price, mean daily return and return covariance of a set of stocks, updated one daily close at a time in O(n^2) instead of being recomputed over the full history.
+    With a plain window, the oldest close and return are retired as new ones arrive (Welford-style add and remove updates), so the statistics match pandas' mean, pct_change().mean() and pct_change().cov() over the last window + 1 closes.
+    With ewma_lambda, every past observation decays by ewma_lambda per day instead and nothing is retired from the statistics.
+    In both modes the last window + 1 closes are kept with their dates, so the daily return history of the window is available for historical simulation and backtests.
+    The state is a plain dictionary of lists (to_dict / from_dict), so it can be stored as JSON and refreshed with only the new closes.
+
+    Inputs:
+        stocks (List[str]): Tickers, in the order of the close prices passed to update.
+        window (int): Number of daily returns in the statistics (plain mode) and in the return history (both modes).
+        ewma_lambda (None|float): If provided, decay factor of exponentially weighted statistics (e.g. 0.94) instead of a plain window.
+
+    Methods:
+        from_closes: Builds the statistics from a DataFrame of close prices.
+        from_dict: Restores statistics saved with to_dict.
+        update: Absorbs one day of close prices.
+        update_many: Absorbs consecutive days of close prices from a DataFrame.
+        mean_price: Returns the mean close price of each stock.
+        mean_returns: Returns the mean daily return of each stock.
+        cov_matrix: Returns the covariance matrix of daily returns.
+        corr_matrix: Returns the correlation matrix of daily returns.
+        returns: Returns the daily returns of the window as a DataFrame indexed by date.
+        to_dict: Returns the state as JSON-serialisable lists.
+    """
+    def __init__(self, stocks: List[str], window: int = 252, ewma_lambda: Optional[float] = None):
+        if ewma_lambda is not None and not 0 < ewma_lambda < 1:
+            raise ValueError("ewma_lambda must be between 0 and 1.")
+        if window < 2:
+            raise ValueError("The window must contain at least 2 returns.")
+        self.stocks = list(stocks)
+        self.window = window
+        self.ewma_lambda = ewma_lambda
+        self.last_date: Optional[str] = None
+
+        stock_len = len(self.stocks)
+        self.closes = deque() # closes still in the window
+        self.dates = deque() # date of each close in self.closes
+        self.price_mean = np.zeros(stock_len)
+        self.num_returns = 0
+        self.return_mean = np.zeros(stock_len)
+        self.return_M2 = np.zeros((stock_len, stock_len)) # sum of cross products of deviations (plain), or the covariance itself (EWMA)
+
+    @classmethod
+    def from_closes(cls, closes: pd.DataFrame, window: int = 252, ewma_lambda: Optional[float] = None) -> "Incremental_ReturnStatistics":
+        statistics = cls(list(closes.columns), window=window, ewma_lambda=ewma_lambda)
+        statistics.update_many(closes)
+        return statistics
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "Incremental_ReturnStatistics":
+        statistics = cls(state["stocks"], window=state["window"], ewma_lambda=state["ewma_lambda"])
+        statistics.last_date = state["last_date"]
+        statistics.closes = deque(np.asarray(close, dtype=float) for close in state["closes"])
+        statistics.dates = deque(state.get("dates", [None] * len(state["closes"])))
+        statistics.price_mean = np.asarray(state["price_mean"], dtype=float)
+        statistics.num_returns = state["num_returns"]
+        statistics.return_mean = np.asarray(state["return_mean"], dtype=float)
+        statistics.return_M2 = np.asarray(state["return_M2"], dtype=float)
+        return statistics
+
+    def update(self, close: np.ndarray, date: Optional[str] = None) -> None:
+        """Absorbs one day of close prices; days with a missing price are skipped."""
+        close = np.asarray(close, dtype=float)
+        if np.isnan(close).any():
+            return
+        if date is not None:
+            self.last_date = str(date)
+
+        if self.ewma_lambda is not None:
+            self._update_ewma(close)
+        else:
+            self.closes.append(close)
+            self.price_mean += (close - self.price_mean) / len(self.closes)
+            if len(self.closes) > 1:
+                self._add_return(close / self.closes[-2] - 1)
+            if len(self.closes) > self.window + 1: # retire the oldest close and the return it started
+                oldest = self.closes.popleft()
+                self.price_mean -= (oldest - self.price_mean) / len(self.closes)
+                self._remove_return(self.closes[0] / oldest - 1)
+
+        self.dates.append(None if date is None else str(date))
+        if len(self.dates) > len(self.closes):
+            self.dates.popleft()
+
+    def update_many(self, closes: pd.DataFrame) -> None:
+        closes = closes[self.stocks]
+        for date, close in zip(closes.index, closes.to_numpy()):
+            self.update(close, date=date)
+
+    def mean_price(self) -> List[float]:
+        return list(self.price_mean)
+
+    def mean_returns(self) -> List[float]:
+        return list(self.return_mean)
+
+    def cov_matrix(self) -> pd.DataFrame:
+        cov = self.return_M2 if self.ewma_lambda is not None else self.return_M2 / max(self.num_returns - 1, 1)
+        return pd.DataFrame(cov, index=self.stocks, columns=self.stocks)
+
+    def corr_matrix(self) -> pd.DataFrame:
+        cov = self.cov_matrix()
+        std = np.sqrt(np.diag(cov))
+        return cov / np.outer(std, std)
+
+    def returns(self) -> pd.DataFrame:
+        """Daily returns between consecutive closes of the window (days with a missing price were skipped), like pct_change().iloc[1:] over those closes."""
+        closes = np.array(self.closes).reshape(-1, len(self.stocks))
+        return pd.DataFrame(closes[1:] / closes[:-1] - 1, index=pd.DatetimeIndex(list(self.dates)[1:]), columns=self.stocks)
+
+    def to_dict(self) -> dict:
+        return {
+            "stocks": self.stocks,
+            "window": self.window,
+            "ewma_lambda": self.ewma_lambda,
+            "last_date": self.last_date,
+            "closes": [close.tolist() for close in self.closes],
+            "dates": list(self.dates),
+            "price_mean": self.price_mean.tolist(),
+            "num_returns": self.num_returns,
+            "return_mean": self.return_mean.tolist(),
+            "return_M2": self.return_M2.tolist()
+        }
+
+    def _add_return(self, daily_return: np.ndarray) -> None:
+        self.num_returns += 1
+        delta = daily_return - self.return_mean
+        self.return_mean += delta / self.num_returns
+        self.return_M2 += np.outer(delta, daily_return - self.return_mean)
+
+    def _remove_return(self, daily_return: np.ndarray) -> None:
+        self.num_returns -= 1
+        delta = daily_return - self.return_mean
+        self.return_mean -= delta / self.num_returns
+        self.return_M2 -= np.outer(delta, daily_return - self.return_mean)
+
+    def _update_ewma(self, close: np.ndarray) -> None:
+        """Exponentially weighted mean and covariance: each day, past weights are multiplied by ewma_lambda and the new observation gets 1 - ewma_lambda."""
+        if not self.closes: # first close seeds the mean price
+            self.price_mean = close.copy()
+        else:
+            self.price_mean += (1 - self.ewma_lambda) * (close - self.price_mean)
+            daily_return = close / self.closes[-1] - 1
+            if self.num_returns == 0: # first return seeds the mean return
+                self.return_mean = daily_return.copy()
+            else:
+                delta = daily_return - self.return_mean
+                increment = (1 - self.ewma_lambda) * delta
+                self.return_mean += increment
+                self.return_M2 = self.ewma_lambda * (self.return_M2 + np.outer(delta, increment))
+            self.num_returns += 1
+        self.closes.append(close) # kept for the return history only
+        if len(self.closes) > self.window + 1:
+            self.closes.popleft()
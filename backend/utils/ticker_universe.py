@@ -0,0 +1,164 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+# Utility
+from backend.utils.market_data import MarketDataProvider, get_provider
+from typing import List, Optional
+from threading import Lock, Thread
+from hashlib import sha256
+from time import time
+import json
+import os
+import tempfile
+
+# Directory of the persisted ticker universes (one folder per provider)
+base_dir = os.path.dirname(os.path.abspath(__file__))
+default_universe_dir = os.environ.get("TICKER_UNIVERSE_DIR", os.path.abspath(os.path.join(base_dir, "..", "data", "ticker_universe")))
+
+class TickerUniverse:
+    """
+    NASDAQ symbols with their company descriptions, persisted as Parquet and indexed for autocomplete.
+    The listing is downloaded when none is stored, then refreshed in a background thread once older than ttl, so callers never wait on the provider after the first run; the file and index are only rebuilt when the refreshed listing differs from the stored one.
+    Symbols are searched by prefix with a binary search over the sorted symbols, and by substring of "symbol description" through a trigram index of row numbers.
+
+    Inputs:
+        directory (str): Folder holding symbols.parquet and metadata.json.
+        provider (MarketDataProvider): Source of the symbol listing.
+        api_key (None|str): Access key passed to the provider's list_symbols.
+        ttl (float): Seconds after which the stored listing is refreshed.
+
+    Methods:
+        symbols: Returns every NASDAQ symbol, sorted.
+        search: Returns the symbols and descriptions matching a query, best matches first.
+        refresh: Downloads the listing and rebuilds the index if it changed.
+    """
+    def __init__(self, directory: str, provider: MarketDataProvider, api_key: Optional[str] = None, ttl: float = 24 * 60 * 60):
+        self.directory = directory
+        self.provider = provider
+        self.api_key = api_key
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+        self.symbols_path = os.path.join(self.directory, "symbols.parquet")
+        self.metadata_path = os.path.join(self.directory, "metadata.json")
+        self._lock = Lock()
+        self._refreshing = False
+        self._next_attempt = 0.0 # failed background refreshes are retried after a minute
+        self.last_error = None
+
+        self.fetched_at, self.digest = 0.0, None
+        self._index = None
+        if os.path.exists(self.symbols_path) and os.path.exists(self.metadata_path):
+            with open(self.metadata_path) as f:
+                metadata = json.load(f)
+            self.fetched_at, self.digest = metadata["fetched_at"], metadata["digest"]
+            self._index = self._build_index(pd.read_parquet(self.symbols_path))
+
+    def symbols(self) -> List[str]:
+        return self._current_index()["symbols"].tolist()
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """
+        Symbols starting with the query come first, followed by symbols whose "symbol description" contains it (queries of 3 or more characters), each group in alphabetical order.
+        Matching ignores case.
+        """
+        index = self._current_index()
+        query = query.strip().lower()
+        if not query or limit < 1:
+            return []
+
+        start = np.searchsorted(index["keys"], query, side="left")
+        end = np.searchsorted(index["keys"], query + "\uffff", side="left")
+        rows = list(range(start, min(end, start + limit)))
+
+        if len(rows) < limit and len(query) >= 3:
+            postings = sorted((index["trigrams"].get(query[i:i + 3]) for i in range(len(query) - 2)), key=lambda p: 0 if p is None else len(p))
+            if postings[0] is not None:
+                # The rarest trigrams narrow the candidates enough; the substring check below confirms the rest
+                candidates = postings[0]
+                for posting in postings[1:3]:
+                    candidates = np.intersect1d(candidates, posting, assume_unique=True)
+                prefixed = set(rows)
+                for row in candidates.tolist():
+                    if len(rows) == limit:
+                        break
+                    if row not in prefixed and query in index["texts"][row]:
+                        rows.append(row)
+
+        return [{"symbol": index["symbols"][row], "description": index["descriptions"][row]} for row in rows]
+
+    def refresh(self) -> None:
+        records = self.provider.list_symbols(self.api_key)
+        listing = sorted({(record["symbol"], record.get("description") or "") for record in records if record.get("mic") == "XNAS"}, key=lambda pair: pair[0].lower())
+        digest = sha256(json.dumps(listing).encode()).hexdigest()
+
+        with self._lock:
+            if digest != self.digest or self._index is None:
+                df_symbols = pd.DataFrame(listing, columns=["symbol", "description"])
+                temporary_path = self.symbols_path + ".tmp"
+                df_symbols.to_parquet(temporary_path, index=False)
+                os.replace(temporary_path, self.symbols_path)
+                self._index = self._build_index(df_symbols)
+                self.digest = digest
+            self.fetched_at = time()
+            temporary_path = self.metadata_path + ".tmp"
+            with open(temporary_path, "w") as f:
+                json.dump({"fetched_at": self.fetched_at, "digest": self.digest, "num_symbols": len(listing)}, f)
+            os.replace(temporary_path, self.metadata_path)
+
+    def _current_index(self) -> dict:
+        """The index, downloading the listing first if none is stored, and starting a background refresh if it is stale."""
+        if self._index is None:
+            self.refresh()
+        elif time() - self.fetched_at > self.ttl and time() >= self._next_attempt:
+            with self._lock:
+                start_refresh = not self._refreshing
+                self._refreshing = True
+            if start_refresh:
+                Thread(target=self._background_refresh, daemon=True).start()
+        return self._index
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+            self.last_error = None
+        except Exception as e: # keep serving the stored listing
+            self.last_error = str(e)
+            self._next_attempt = time() + 60
+        finally:
+            self._refreshing = False
+
+    @staticmethod
+    def _build_index(df_symbols: pd.DataFrame) -> dict:
+        symbols = df_symbols["symbol"].to_numpy(dtype=object)
+        descriptions = df_symbols["description"].to_numpy(dtype=object)
+        texts = [f"{symbol} {description}".lower() for symbol, description in zip(symbols, descriptions)]
+
+        trigrams = {}
+        for row, text in enumerate(texts):
+            for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                trigrams.setdefault(trigram, []).append(row)
+
+        return {
+            "symbols": symbols,
+            "descriptions": descriptions,
+            "keys": np.array([symbol.lower() for symbol in symbols], dtype=str), # sorted, for prefix search
+            "texts": texts,
+            "trigrams": {trigram: np.array(rows, dtype=np.int32) for trigram, rows in trigrams.items()}
+        }
+
+_ticker_universes = {}
+
+def get_ticker_universe(api_key: Optional[str] = None) -> TickerUniverse:
+    """
+    Returns the ticker universe of the current market data provider, with api_key defaulting to FINNHUB_API_KEY.
+    Each provider has its own folder under TICKER_UNIVERSE_DIR (default backend/data/ticker_universe); non-persistent providers such as replay panels use a temporary folder per process.
+    """
+    provider = get_provider()
+    if id(provider) not in _ticker_universes:
+        directory = os.path.join(default_universe_dir, provider.name) if provider.persistent else tempfile.mkdtemp(prefix=f"ticker_universe_{provider.name}_")
+        _ticker_universes[id(provider)] = TickerUniverse(directory, provider, api_key=api_key or os.environ.get("FINNHUB_API_KEY"))
+    universe = _ticker_universes[id(provider)]
+    if api_key is not None:
+        universe.api_key = api_key
+    return universe
@@ -0,0 +1,151 @@
+# Imports
+import numpy as np
+import plotly.graph_objects as go
+from scipy.stats import chi2
+
+# Utility
+from backend.utils.data_fetching import MonteCarlo_StockData # type hint
+from backend.utils.risk_statistics import kupiec_pof_test, christoffersen_independence_test
+from typing import Union
+from plotly.graph_objects import Figure
+
+# Forecast dates simulated per batch (dates x num_simulations x stocks normal draws held at once)
+BACKTEST_DATE_CHUNK = 64
+
+class VaR_Backtest:
+    """
+    Rolling one-day-ahead backtest of the Monte Carlo Value at Risk against realised portfolio returns.
+    For every day after the first window, the mean and covariance of the previous window of daily returns are updated incrementally (one day added, one day dropped), the next day's portfolio return is simulated as in MonteCarloSimulation, and its VaR is compared with the realised return.
+    Forecast dates are simulated in batches, so a single download of the full history covers the whole backtest.
+
+    Inputs:
+        stock_data (MonteCarlo_StockData): Financial information of stocks of a portfolio; its daily return history is the backtest period (including the first estimation window).
+        window (int): Number of trading days used to estimate the mean and covariance for each forecast.
+        num_simulations (int): Number of Monte Carlo simulations per forecast date.
+        var_percentile (float): Percentile of the simulated return distribution used as the VaR.
+        seed (None|int): Seed for the random number generator. If input == None, results are not reproducible.
+
+    Methods:
+        get_results: Returns the exception count and rate with the Kupiec, Christoffersen and conditional coverage statistics.
+        get_series: Returns the forecast dates, VaR forecasts, realised returns and exceptions.
+        plot_backtest: Plots realised returns against the VaR forecasts, marking exceptions.
+    """
+    def __init__(self, stock_data: MonteCarlo_StockData, window: int = 252, num_simulations: int = 1000, var_percentile: float = 5, seed: Union[None, int] = None):
+        returns = stock_data.returns.dropna()
+        if len(returns) <= window:
+            raise ValueError(f"The return history ({len(returns)} days) must be longer than the estimation window ({window} days).")
+        if window < 2:
+            raise ValueError("The estimation window must contain at least 2 days.")
+
+        self.stock_data = stock_data
+        self.window = window
+        self.num_sim = num_simulations
+        self.var_percentile = var_percentile
+        self.rng = np.random.default_rng(seed)
+        self.weights = np.asarray(stock_data.weights)
+
+        returns_matrix = returns.to_numpy()
+        self.dates = returns.index[window:]
+        self.realised_returns = returns_matrix[window:] @ self.weights
+        self.VaR = self._forecast_VaR(returns_matrix)
+        self.exceptions = self.realised_returns < self.VaR
+
+    def get_results(self) -> dict:
+        num_observations = len(self.exceptions)
+        num_exceptions = int(self.exceptions.sum())
+        kupiec_lr, kupiec_p_value = kupiec_pof_test(num_exceptions, num_observations, self.var_percentile)
+        christoffersen_lr, christoffersen_p_value = christoffersen_independence_test(self.exceptions)
+        conditional_coverage_lr = kupiec_lr + christoffersen_lr
+
+        return {
+            "num_observations": num_observations,
+            "num_exceptions": num_exceptions,
+            "expected_exceptions": num_observations * self.var_percentile / 100,
+            "exception_rate": num_exceptions / num_observations,
+            "kupiec_lr": float(kupiec_lr),
+            "kupiec_p_value": float(kupiec_p_value),
+            "christoffersen_lr": float(christoffersen_lr),
+            "christoffersen_p_value": float(christoffersen_p_value),
+            "conditional_coverage_lr": float(conditional_coverage_lr),
+            "conditional_coverage_p_value": float(chi2.sf(conditional_coverage_lr, df=2))
+        }
+
+    def get_series(self) -> dict:
+        return {
+            "dates": [str(date) for date in self.dates],
+            "VaR": self.VaR.tolist(),
+            "realised_returns": self.realised_returns.tolist(),
+            "exceptions": self.exceptions.tolist()
+        }
+
+    def plot_backtest(self, return_as_json: bool = True) -> Union[str, Figure]:
+        """Generates realised daily portfolio returns against the VaR forecasts using Plotly."""
+        fig = go.Figure()
+
+        fig.add_trace(go.Scatter(
+            x=self.dates,
+            y=self.realised_returns,
+            mode='lines',
+            name='Realised Return',
+            line=dict(color='#007acc', width=1),
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=self.dates,
+            y=self.VaR,
+            mode='lines',
+            name=f'VaR ({self.var_percentile}%)',
+            line=dict(color='red', width=1.5),
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=self.dates[self.exceptions],
+            y=self.realised_returns[self.exceptions],
+            mode='markers',
+            name='Exception',
+            marker=dict(color='red', size=6),
+        ))
+
+        fig.update_layout(
+            title="VaR Backtest",
+            xaxis_title="Date",
+            yaxis_title="Daily Portfolio Return",
+            template="plotly_white"
+        )
+
+        if return_as_json:
+            return fig.to_json()
+        else:
+            return fig
+
+    def _forecast_VaR(self, returns_matrix: np.ndarray) -> np.ndarray:
+        """VaR of the simulated next-day portfolio return for every forecast date, from the rolling window before it."""
+        num_dates = len(returns_matrix) - self.window
+        stock_len = returns_matrix.shape[1]
+        VaR = np.empty(num_dates)
+
+        # Running sums over the current window; covariance = (sum of cross products - n * mean mean^T) / (n - 1), as in pandas
+        window_sum = returns_matrix[:self.window].sum(axis=0)
+        window_cross = returns_matrix[:self.window].T @ returns_matrix[:self.window]
+
+        for chunk_start in range(0, num_dates, BACKTEST_DATE_CHUNK):
+            chunk_dates = range(chunk_start, min(chunk_start + BACKTEST_DATE_CHUNK, num_dates))
+            portfolio_means = np.empty(len(chunk_dates))
+            cov_matrices = np.empty((len(chunk_dates), stock_len, stock_len))
+
+            for i, date in enumerate(chunk_dates):
+                if date > 0: # slide the window by one day
+                    added, dropped = returns_matrix[date + self.window - 1], returns_matrix[date - 1]
+                    window_sum += added - dropped
+                    window_cross += np.outer(added, added) - np.outer(dropped, dropped)
+                mean_returns = window_sum / self.window
+                portfolio_means[i] = mean_returns @ self.weights
+                cov_matrices[i] = (window_cross - self.window * np.outer(mean_returns, mean_returns)) / (self.window - 1)
+
+            # L^T w for every date, so that the simulated portfolio return w . (mean + L z) = w . mean + z . (L^T w)
+            portfolio_loadings = np.einsum('dij,i->dj', np.linalg.cholesky(cov_matrices), self.weights)
+            Z = self.rng.standard_normal(size=(len(chunk_dates), self.num_sim, stock_len))
+            simulated_returns = portfolio_means[:, np.newaxis] + np.einsum('dsn,dn->ds', Z, portfolio_loadings)
+            VaR[chunk_dates.start:chunk_dates.stop] = np.percentile(simulated_returns, self.var_percentile, axis=1)
+
+        return VaR
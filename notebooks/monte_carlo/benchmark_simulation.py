@@ -0,0 +1,61 @@
+# Command line: python -m notebooks.monte_carlo.benchmark_simulation
+# Compares the original per-simulation loop against the batched path generator of MonteCarloSimulation.
+# Uses a synthetic portfolio so no network access is required.
+
+# Imports
+import numpy as np
+import pandas as pd
+from time import perf_counter
+
+# Classes
+from backend.monte_carlo import MonteCarloSimulation
+from backend.utils.data_fetching import MonteCarlo_StockData
+
+NUM_STOCKS = 20
+FORECAST_TIMEFRAME = 30
+PATH_COUNTS = [1_000, 10_000, 100_000]
+
+class Synthetic_StockData(MonteCarlo_StockData):
+    """Replaces the yfinance download with a randomly generated return history."""
+    def _fetch_data(self) -> tuple:
+        rng = np.random.default_rng(0)
+        factors = rng.normal(0, 0.01, size=(252, 3))
+        loadings = rng.uniform(0.5, 1.5, size=(3, len(self.stocks)))
+        returns = pd.DataFrame(factors @ loadings + rng.normal(0.0005, 0.01, size=(252, len(self.stocks))), columns=self.stocks)
+        self.returns = returns
+        mean_price = rng.uniform(50, 500, size=len(self.stocks))
+        return list(mean_price), list(returns.mean()), returns.cov(), returns.corr()
+
+def legacy_simulation_matrix(monte_carlo: MonteCarloSimulation) -> np.ndarray:
+    """The original loop: one Cholesky factorisation and one draw per simulation."""
+    stock_data = monte_carlo.stock_data
+    mean_matrix = np.full(shape=(monte_carlo.time, monte_carlo.stock_len), fill_value=stock_data.mean_returns).T
+    sims_matrix = np.zeros((monte_carlo.time, monte_carlo.num_sim))
+
+    for m in range(monte_carlo.num_sim):
+        Z = np.random.normal(size=(monte_carlo.time, monte_carlo.stock_len))
+        L = np.linalg.cholesky(stock_data.cov_matrix)
+        daily_returns = mean_matrix + np.inner(L, Z)
+        sims_matrix[:, m] = np.cumprod(np.inner(stock_data.weights, daily_returns.T) + 1) * monte_carlo.init_portfolio_value
+
+    return sims_matrix
+
+def main():
+    stock_data = Synthetic_StockData(stock_list=[f"STK{i}" for i in range(NUM_STOCKS)])
+
+    print(f"{'paths':>8} {'legacy (s)':>11} {'batched (s)':>12} {'speedup':>8} {'legacy mean':>12} {'batched mean':>13} {'legacy std':>11} {'batched std':>12}")
+    for num_simulations in PATH_COUNTS:
+        start = perf_counter()
+        monte_carlo = MonteCarloSimulation(stock_data=stock_data, forecast_timeframe=FORECAST_TIMEFRAME, num_simulations=num_simulations, seed=42)
+        batched_time = perf_counter() - start
+
+        start = perf_counter()
+        legacy_final_values = legacy_simulation_matrix(monte_carlo)[-1]
+        legacy_time = perf_counter() - start
+
+        print(f"{num_simulations:>8} {legacy_time:>11.3f} {batched_time:>12.3f} {legacy_time / batched_time:>7.1f}x "
+              f"{legacy_final_values.mean():>12.2f} {monte_carlo.final_values.mean():>13.2f} "
+              f"{legacy_final_values.std():>11.2f} {monte_carlo.final_values.std():>12.2f}")
+
+if __name__ == "__main__":
+    main()
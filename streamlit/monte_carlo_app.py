@@ -46,6 +46,17 @@ def monte_carlo_initialise_request(stock_symbols: list, num_each_stock: list, hi
 
      return response.json()
 
+def monte_carlo_reprice_request(num_each_stock: list) -> dict:
+     header = {"Content-Type": "application/json"}
+
+     response = rpost(
+          url=backend_url+"/monte_carlo/reprice",
+          headers=header,
+          json={"num_each_stock": num_each_stock}
+     )
+
+     return response.json()
+
 def monte_carlo_get_key_data() -> dict:
     header = {"Content-Type": "application/json"}
 
@@ -57,9 +68,14 @@ def monte_carlo_get_key_data() -> dict:
     return response.json()
 
 def monte_carlo_plot_simulation_lines() -> Figure:
+    # Percentile bands keep the payload small regardless of the number of simulations
     response = rpost(
-          url=backend_url+"/monte_carlo/plot_simulation_lines"
+          url=backend_url+"/monte_carlo/plot_simulation_fan"
      )
+    if response.status_code == 400: # streaming run without a quantile sketch
+        response = rpost(
+              url=backend_url+"/monte_carlo/plot_simulation_lines"
+         )
 
     plot_json = response.json()
     fig = go.Figure(loads(plot_json))
@@ -261,6 +277,13 @@ def sidebar():
     generate_button = st.sidebar.button("Generate")
 
     if generate_button:
+        # Only the shares changed: reprice the stored simulation instead of downloading and simulating again
+        shares_only = (st.session_state.monte_carlo_results is not None
+                       and stock_symbols == st.session_state.stock_symbols
+                       and historical_timeframe == st.session_state.historical_timeframe
+                       and forecast_timeframe == st.session_state.forecast_timeframe
+                       and num_simulations == st.session_state.num_simulations)
+
         # Save current parameters
         st.session_state.stock_symbols = stock_symbols
         st.session_state.historical_timeframe = historical_timeframe
@@ -271,12 +294,23 @@ def sidebar():
         try:
             st.session_state.generated = True
             
-            monte_carlo_initialise_request(st.session_state.stock_symbols, list(st.session_state.num_each_stock.values()), 
-                                        st.session_state.historical_timeframe, st.session_state.forecast_timeframe, st.session_state.num_simulations)
+            # A failed reprice (streamed simulation, restarted backend) falls back to a fresh simulation rather than showing stale results
+            repriced = shares_only and "detail" not in monte_carlo_reprice_request(list(st.session_state.num_each_stock.values()))
+            if not repriced:
+                response = monte_carlo_initialise_request(st.session_state.stock_symbols, list(st.session_state.num_each_stock.values()), 
+                                            st.session_state.historical_timeframe, st.session_state.forecast_timeframe, st.session_state.num_simulations)
+                # The backend costs each simulation before running it and may reject, stream or queue it
+                if "detail" in response:
+                    st.session_state.generated = False
+                    st.sidebar.error(response["detail"]["message"] if isinstance(response["detail"], dict) else response["detail"])
+                    return
+                if response["cost_estimate"]["decision"] != "accept":
+                    st.sidebar.info(f"Large simulation ({response['cost_estimate']['decision']}): estimated {response['cost_estimate']['seconds']:.1f} seconds and {response['cost_estimate']['peak_bytes'] / 1024**2:.0f} MB.")
             
             # Get key data and store portfolio value separately
             key_data = monte_carlo_get_key_data()
             st.session_state.portfolio_value = key_data.pop("portfolio_value")
+            key_data.pop("factor_model", None)
             
             # Store all results in session state
             st.session_state.monte_carlo_results = {